@@ -1,16 +1,47 @@
 """The MSpa integration."""
 
 from __future__ import annotations
+import asyncio
 import logging
+import time
 from datetime import timedelta
 
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import Platform
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.exceptions import ConfigEntryNotReady
+from homeassistant.helpers.aiohttp_client import async_create_clientsession, async_get_clientsession
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
 
-from .const import DOMAIN, API_BASE_URL
-from .mspaapi import MSPAAPI, MSPAAPIException
+from .capabilities import get_capabilities, learn_capabilities, merge_desired_state
+from .capture import TrafficRecorder
+from .const import (
+    DOMAIN,
+    API_BASE_URL,
+    API_ENDPOINTS,
+    CAPTURE_FILE,
+    COMMAND_BUDGET,
+    COMMAND_QUEUED,
+    CONF_CAPTURE,
+    CONF_CAPABILITIES,
+    CONF_EXTRA_DEVICES,
+    CONF_PUBLISH_DEADBAND,
+    CONF_PUBLISH_HEARTBEAT,
+    CONF_PUBLISH_MIN_INTERVAL,
+    CONF_THRESHOLDS,
+    CONF_TRACE,
+    DEFAULT_PUBLISH_POLICIES,
+    DEVICE_POLL_BUDGET,
+    MAX_CONCURRENT_FETCHES,
+    MODE_ACCOUNT,
+    MODE_DEVICE,
+    REFRESH_BUDGET,
+    TRACE_FILE,
+)
+from .journal import CommandJournal
+from .mspaapi import MSPAAPI, MSPAAPIClosed, MSPAAPIConnectionError, MSPAAPIException
+from .telemetry import HeatingRateEstimator, PublishPolicy, ShadowCadenceTracker
+from .tracing import Tracer
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -18,66 +49,177 @@ PLATFORMS: list[Platform] = [Platform.SENSOR,Platform.SWITCH,Platform.CLIMATE,Pl
 
 SCAN_INTERVAL = timedelta(minutes=15)
 
+# Predictive polling: land this long after a predicted threshold crossing,
+# but never poll more often than MIN_SCAN_INTERVAL
+PREDICTION_MARGIN = timedelta(seconds=30)
+MIN_SCAN_INTERVAL = timedelta(minutes=1)
+
+# Phase locking: poll this long after the shadow's expected next report
+PHASE_MARGIN = timedelta(seconds=10)
+
+# How often an account-mode entry re-lists the account's devices
+DEVICE_LIST_INTERVAL = timedelta(hours=1)
+
+# How often the candidate API endpoints are re-probed for latency
+ENDPOINT_PROBE_INTERVAL = timedelta(hours=6)
+
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up MSpa from a config entry."""
-    
+
     # Get configuration data
     username = entry.data["username"]
     password = entry.data["password"]
-    device_id = entry.data["device_id"]
-    product_id = entry.data["product_id"]
     access_token = entry.data.get("access_token")
-    
-    # Create API instance
+    account_mode = entry.data.get("mode", MODE_DEVICE) == MODE_ACCOUNT
+
+    recorder = None
+    if entry.options.get(CONF_CAPTURE):
+        path = hass.config.path(CAPTURE_FILE.format(entry_id=entry.entry_id))
+        recorder = await hass.async_add_executor_job(TrafficRecorder, path)
+        _LOGGER.info("Capturing MSpa API traffic to %s", path)
+
+    tracer = None
+    session = None
+    if entry.options.get(CONF_TRACE):
+        path = hass.config.path(TRACE_FILE.format(entry_id=entry.entry_id))
+        tracer = await hass.async_add_executor_job(lambda: Tracer(path=path))
+        # The shared session reports no connection timings, so traced
+        # requests go through a session of their own, closed on unload
+        session = async_create_clientsession(hass, auto_cleanup=False, trace_configs=[tracer.trace_config()])
+        _LOGGER.info("Tracing MSpa requests to %s", path)
+
+    # Create API instance on Home Assistant's shared HTTP session, or the tracing one
     api = MSPAAPI(
         base_url=API_BASE_URL,
-        device_id=device_id,
-        product_id=product_id,
+        session=session or async_get_clientsession(hass),
+        device_id=entry.data.get("device_id"),
+        product_id=entry.data.get("product_id"),
         username=username,
         password=password,
-        access_token=access_token
+        access_token=access_token,
+        endpoints=API_ENDPOINTS,
+        recorder=recorder,
+        tracer=tracer,
     )
+    await api.probe_endpoints()
+
+    if account_mode:
+        try:
+            with api.deadline(REFRESH_BUDGET):
+                devices = await api.get_user_devices()
+        except MSPAAPIException as e:
+            await _async_close_api(api, session)
+            raise ConfigEntryNotReady(f"Unable to list MSpa devices: {e}") from e
+    else:
+        devices = [
+            {
+                "device_id": device["device_id"],
+                "product_id": device["product_id"],
+                "product_model": device.get("product_model"),
+                "name": device.get("device_name"),
+            }
+            # Spas added from the options flow join the entry's own device
+            for device in [entry.data, *entry.options.get(CONF_EXTRA_DEVICES, [])]
+        ]
 
     # Create shared coordinator
-    coordinator = MSPADataUpdateCoordinator(hass, api)
-    await coordinator.async_config_entry_first_refresh()
+    coordinator = MSPADataUpdateCoordinator(hass, entry, api, devices, account_mode)
+    await coordinator.async_load_journal()
+    try:
+        await coordinator.async_config_entry_first_refresh()
+    except Exception:
+        await _async_close_api(api, session)
+        raise
 
     # Store coordinator in hass.data for platforms to access
     hass.data.setdefault(DOMAIN, {})
     hass.data[DOMAIN][entry.entry_id] = {
         "coordinator": coordinator,
         "api": api,
+        "session": session,
+        # Entry data changes (a new access token) do not need a reload
+        "options": dict(entry.options),
     }
 
     # Set up platforms
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
 
+    entry.async_on_unload(entry.add_update_listener(async_reload_entry))
+
     return True
 
 
+async def async_reload_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Reload a config entry after its options changed."""
+    data = hass.data.get(DOMAIN, {}).get(entry.entry_id)
+    if data is not None and data["options"] == entry.options:
+        return
+    await hass.config_entries.async_reload(entry.entry_id)
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
     unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
-    
+
     if unload_ok:
         # Clean up stored data
         if DOMAIN in hass.data:
-            hass.data[DOMAIN].pop(entry.entry_id, None)
-            
+            data = hass.data[DOMAIN].pop(entry.entry_id, None)
+            if data is not None:
+                # Stop polling and fail the requests still waiting on the
+                # cloud, so a reload during a stall does not wait them out
+                await data["coordinator"].async_shutdown()
+                await _async_close_api(data["api"], data["session"])
+
             # Clean up domain data if no more entries
             if not hass.data[DOMAIN]:
                 hass.data.pop(DOMAIN)
-    
+
     return unload_ok
 
 
+async def _async_close_api(api: MSPAAPI, session) -> None:
+    """Close the API client and the tracing session it was given, if any."""
+    await api.close()
+    if session is not None:
+        await session.close()
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Delete the command journal of a removed config entry."""
+    await CommandJournal(hass, entry.entry_id).async_remove()
+
+
 class MSPADataUpdateCoordinator(DataUpdateCoordinator):
-    """Shared coordinator to manage fetching data from the API."""
+    """Shared coordinator to manage fetching data from the API.
 
-    def __init__(self, hass: HomeAssistant, api: MSPAAPI):
+    Data is a dict of device_id -> thing_shadow, so a single coordinator
+    serves every device of an account-mode entry.
+    """
+
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry, api: MSPAAPI, devices: list[dict], account_mode: bool = False):
         """Initialize the data update coordinator."""
         self._api = api
+        self._entry = entry
+        self._account_mode = account_mode
+        self._semaphore = asyncio.Semaphore(MAX_CONCURRENT_FETCHES)
+        self._devices_listed_at = time.monotonic()
+        self._endpoints_probed_at = time.monotonic()
+        self.journal = CommandJournal(hass, entry.entry_id)
+        self.publish_policies = self._build_publish_policies(entry)
+        self.devices: dict[str, dict] = {}
+        self.telemetry: dict[str, HeatingRateEstimator] = {}
+        self.cadence: dict[str, ShadowCadenceTracker] = {}
+        learned = entry.data.get(CONF_CAPABILITIES, {})
+        for device in devices:
+            stored = learned.get(device["device_id"])
+            self.devices[device["device_id"]] = {
+                **device,
+                "capabilities": get_capabilities(None) if stored is None else frozenset(stored),
+            }
+            self.telemetry[device["device_id"]] = HeatingRateEstimator()
+            self.cadence[device["device_id"]] = ShadowCadenceTracker()
         super().__init__(
             hass,
             _LOGGER,
@@ -85,12 +227,215 @@ class MSPADataUpdateCoordinator(DataUpdateCoordinator):
             update_interval=SCAN_INTERVAL,
         )
 
-    async def _async_update_data(self):
-        """Fetch data from the API."""
+    @staticmethod
+    def _build_publish_policies(entry: ConfigEntry) -> dict[str, PublishPolicy]:
+        """Return the default policies with the water temperature options applied."""
+        policies = {key: dict(policy) for key, policy in DEFAULT_PUBLISH_POLICIES.items()}
+        water = policies["water_temperature"]
+        water["deadband"] = entry.options.get(CONF_PUBLISH_DEADBAND, water["deadband"])
+        water["min_interval"] = entry.options.get(CONF_PUBLISH_MIN_INTERVAL, water["min_interval"])
+        water["heartbeat"] = entry.options.get(CONF_PUBLISH_HEARTBEAT, water["heartbeat"])
+        return {key: PublishPolicy(**policy) for key, policy in policies.items()}
+
+    @callback
+    def _learn_capabilities(self, data: dict) -> None:
+        """Limit each device to the keys its polled shadow reports and store them.
+
+        Only a shadow that reports capabilities replaces the stored set, so a
+        spa that is offline keeps what was learned while it was online.
+        Entities follow the stored set from the next setup on.
+        """
+        stored = self._entry.data.get(CONF_CAPABILITIES, {})
+        learned = {device_id: stored[device_id] for device_id in self.devices if device_id in stored}
+        for device_id, device in self.devices.items():
+            capabilities = learn_capabilities(data.get(device_id))
+            if capabilities is not None:
+                device["capabilities"] = capabilities
+                learned[device_id] = sorted(capabilities)
+        if learned != stored:
+            self.hass.config_entries.async_update_entry(self._entry, data={**self._entry.data, CONF_CAPABILITIES: learned})
+
+    async def async_load_journal(self) -> None:
+        """Restore queued commands, dropping those of devices no longer present."""
+        await self.journal.async_load()
+        for device_id in list(self.journal.pending):
+            if device_id not in self.devices:
+                self.journal.discard(device_id)
+
+    async def _async_send(self, device_id: str, desired_state: dict) -> dict:
+        device = self.devices[device_id]
+        with self._api.tracer.span("command", device=device_id), self._api.deadline(COMMAND_BUDGET):
+            return await self._api.send_device_command(
+                desired_state,
+                device_id=device_id,
+                product_id=device["product_id"],
+            )
+
+    async def async_send_command(self, device_id: str, desired_state: dict) -> dict:
+        """Send desired state to one of the coordinator's devices.
+
+        Commands still queued for the device are folded in first. If the
+        cloud is unreachable the command joins the journal instead and a
+        QUEUED response is returned, so entities keep their optimistic state.
+        A command cut off by unloading the entry is queued the same way and
+        sent by the next setup.
+        """
+        capabilities = self.devices[device_id]["capabilities"]
+        pending = self.journal.pending.get(device_id)
+        if pending:
+            desired_state = merge_desired_state(pending, desired_state, capabilities)
         try:
-            data = await self._api.get_device_status()
-            _LOGGER.debug("Fetched MSpa data: %s", data)
-            return data
+            response = await self._async_send(device_id, desired_state)
+        except MSPAAPIConnectionError as e:
+            _LOGGER.warning("MSpa cloud unreachable, queued command for %s: %s", device_id, e)
+            self.journal.record(device_id, desired_state, capabilities)
+            return {"code": 0, "message": COMMAND_QUEUED}
+        except MSPAAPIClosed:
+            _LOGGER.debug("MSpa entry unloading, queued command for %s", device_id)
+            self.journal.record(device_id, desired_state, capabilities)
+            # The journal was saved on shutdown, before this was cut off
+            await self.journal.async_save()
+            return {"code": 0, "message": COMMAND_QUEUED}
+        self.journal.discard(device_id)
+        return response
+
+    async def async_shutdown(self) -> None:
+        """Cancel scheduled polls and save queued commands for the next setup."""
+        await super().async_shutdown()
+        await self.journal.async_save()
+
+    async def _async_check_device_list(self) -> None:
+        """Reload the entry when devices were added to or removed from the account."""
+        if time.monotonic() - self._devices_listed_at < DEVICE_LIST_INTERVAL.total_seconds():
+            return
+        self._devices_listed_at = time.monotonic()
+        try:
+            devices = await self._api.get_user_devices()
+        except MSPAAPIClosed:
+            raise
         except MSPAAPIException as e:
-            _LOGGER.error("Error fetching MSpa data: %s", e)
-            return {}
+            _LOGGER.warning("Error listing MSpa devices: %s", e)
+            return
+        if {device["device_id"] for device in devices} != set(self.devices):
+            _LOGGER.info("MSpa device list changed, reloading %s", self._entry.title)
+            self.hass.async_create_task(
+                self.hass.config_entries.async_reload(self._entry.entry_id)
+            )
+
+    async def _async_fetch_device(self, device: dict) -> dict:
+        """Fetch one device's shadow, bounded by the shared semaphore."""
+        async with self._semaphore:
+            try:
+                with self._api.tracer.span("poll_device", device=device["device_id"]), self._api.deadline(DEVICE_POLL_BUDGET):
+                    data = await self._api.get_device_status(device["device_id"], device["product_id"])
+                _LOGGER.debug("Fetched MSpa data for %s: %s", device["device_id"], data)
+                return data or {}
+            except MSPAAPIClosed:
+                raise
+            except MSPAAPIException as e:
+                _LOGGER.error("Error fetching MSpa data for %s: %s", device["device_id"], e)
+                return {}
+
+    async def _async_update_data(self):
+        """Fetch data from the API within one refresh budget."""
+        try:
+            with self._api.tracer.span("refresh", devices=len(self.devices)), self._api.deadline(REFRESH_BUDGET):
+                data = await self._async_update_data_within_budget()
+        except MSPAAPIClosed:
+            # The entry was unloaded mid-refresh; keep the last data rather
+            # than logging an error from a discarded coordinator
+            return self.data
+        self._learn_capabilities(data)
+        self._store_access_token()
+        return data
+
+    @callback
+    def _store_access_token(self) -> None:
+        """Keep the entry's token current, so the next setup starts with a valid one."""
+        token = self._api.access_token
+        if token and token != self._entry.data.get("access_token"):
+            self.hass.config_entries.async_update_entry(self._entry, data={**self._entry.data, "access_token": token})
+
+    @callback
+    def async_update_listeners(self) -> None:
+        """Update the entities, timing the fan-out when tracing."""
+        with self._api.tracer.span("fan_out", listeners=len(self._listeners)):
+            super().async_update_listeners()
+
+    async def _async_update_data_within_budget(self):
+        if time.monotonic() - self._endpoints_probed_at >= ENDPOINT_PROBE_INTERVAL.total_seconds():
+            self._endpoints_probed_at = time.monotonic()
+            _LOGGER.debug("Using MSpa endpoint %s", await self._api.probe_endpoints())
+        if self.journal.pending:
+            # Deliver queued intents before reading back the shadows
+            with self._api.tracer.span("flush_journal", devices=len(self.journal.pending)):
+                await self.journal.async_flush(self._async_send)
+        if self._account_mode:
+            await self._async_check_device_list()
+        results = await asyncio.gather(
+            *(self._async_fetch_device(device) for device in self.devices.values())
+        )
+        data = dict(zip(self.devices, results))
+        self._record_telemetry(data)
+        self.update_interval = self._next_update_interval(data)
+        return data
+
+    def _record_telemetry(self, data: dict) -> None:
+        """Feed every polled shadow to the cadence and heating models."""
+        now = time.time()
+        for device_id, shadow in data.items():
+            self.cadence[device_id].observe(now, shadow)
+            if "water_temperature" in shadow:
+                # API returns doubled Celsius values
+                self.telemetry[device_id].add(
+                    now,
+                    shadow["water_temperature"] * 0.5,
+                    shadow.get("heater_state", 0),
+                )
+
+    def _next_update_interval(self, data: dict) -> timedelta:
+        """Schedule the next poll just after the earliest predicted crossing.
+
+        While a device heats towards temperature_setting or a configured
+        threshold, the next thing_shadow read lands PREDICTION_MARGIN after
+        the crossing predicted from the heating rate. Otherwise poll sparsely.
+        When the shadow carries report times and the device's cadence is
+        known, the poll is moved to just after the report that will carry
+        the new data; otherwise the schedule is left as is.
+        """
+        thresholds = self._entry.options.get(CONF_THRESHOLDS, [])
+        now = time.time()
+        delay = SCAN_INTERVAL
+        for device_id, shadow in data.items():
+            targets = list(thresholds)
+            if "temperature_setting" in shadow:
+                # API returns doubled Celsius values
+                targets.append(shadow["temperature_setting"] * 0.5)
+            device_delay = None
+            for target in targets:
+                hours = self.telemetry[device_id].hours_to(target)
+                if hours is not None:
+                    predicted = timedelta(hours=hours) + PREDICTION_MARGIN
+                    device_delay = predicted if device_delay is None else min(device_delay, predicted)
+            delay = min(delay, self._align_to_report(device_id, now, device_delay))
+        return max(delay, MIN_SCAN_INTERVAL)
+
+    def _align_to_report(self, device_id: str, now: float, predicted: timedelta | None) -> timedelta:
+        """Land a poll just after one of the device's expected shadow reports.
+
+        A predicted crossing is only visible from the first report after it,
+        so that delay is pushed forward. A sparse poll is pulled back to the
+        last report before SCAN_INTERVAL elapses.
+        """
+        delay = SCAN_INTERVAL if predicted is None else predicted
+        tracker = self.cadence[device_id]
+        margin = PHASE_MARGIN.total_seconds()
+        report = tracker.next_report(now + delay.total_seconds() - margin)
+        if report is None:
+            return delay
+        if predicted is None and report + margin > now + delay.total_seconds():
+            report -= tracker.interval
+        aligned = report + margin - now
+        if aligned < MIN_SCAN_INTERVAL.total_seconds():
+            return delay
+        return timedelta(seconds=aligned)
@@ -0,0 +1,340 @@
+"""Command line client for the MSpa cloud API.
+
+Run from the directory that contains custom_components, for example::
+
+    python -m custom_components.mspa devices
+    python -m custom_components.mspa poll <device_id> --interval 30
+    python -m custom_components.mspa command <device_id> heater_state=1
+    python -m custom_components.mspa serve --port 8080 --latency 0.2
+    python -m custom_components.mspa soak --base-url http://127.0.0.1:8080/api --clients 50
+    python -m custom_components.mspa teardown --clients 10 --requests 4
+
+Credentials come from --username/--password or the MSPA_USERNAME and
+MSPA_PASSWORD environment variables. Nothing here needs Home Assistant, but
+``-m`` imports the package __init__, which does; without it installed, run
+``python scripts/mspa_cli.py`` with the same arguments instead.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from collections import Counter
+
+from aiohttp import ClientSession, TCPConnector
+
+from .const import API_BASE_URL
+from .mspaapi import MSPAAPI, MSPAAPIException
+from .standin import StandInServer
+from .tracing import Tracer
+
+
+def _percentile(ordered: list[float], fraction: float) -> float | None:
+    """Return the nearest-rank percentile of an ascending list."""
+    if not ordered:
+        return None
+    index = min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+def _parse_state(assignments: list[str]) -> dict:
+    """Turn key=value arguments into a desired state; values are JSON when they parse."""
+    desired = {}
+    for assignment in assignments:
+        key, separator, value = assignment.partition("=")
+        if not separator or not key:
+            raise SystemExit(f"Expected key=value, got {assignment!r}")
+        try:
+            desired[key] = json.loads(value)
+        except ValueError:
+            desired[key] = value
+    return desired
+
+
+def _print_json(value) -> None:
+    print(json.dumps(value, indent=2, sort_keys=True))
+
+
+def _client(args, session=None) -> MSPAAPI:
+    if not args.username or not args.password:
+        raise SystemExit("Set --username/--password or MSPA_USERNAME/MSPA_PASSWORD")
+    return MSPAAPI(
+        base_url=args.base_url,
+        session=session,
+        timeout=args.timeout,
+        username=args.username,
+        password=args.password,
+        country=args.country,
+        tracer=args.tracer,
+    )
+
+
+async def _product_id(api: MSPAAPI, device_id: str, product_id: str | None) -> str:
+    """Return product_id, looking it up in the device list when not given."""
+    if product_id:
+        return product_id
+    for device in await api.get_user_devices():
+        if device["device_id"] == device_id:
+            return device["product_id"]
+    raise SystemExit(f"Device {device_id} is not on this account")
+
+
+async def _login(args) -> None:
+    async with _client(args) as api:
+        start = time.perf_counter()
+        await api.login()
+        print(f"Logged in to {api.base_url} in {time.perf_counter() - start:.3f}s")
+        if args.show_token:
+            print(api.access_token)
+
+
+async def _devices(args) -> None:
+    async with _client(args) as api:
+        _print_json(await api.get_user_devices())
+
+
+async def _poll(args) -> None:
+    async with _client(args) as api:
+        product_id = await _product_id(api, args.device_id, args.product_id)
+        polls = 0
+        while args.count is None or polls < args.count:
+            if polls:
+                await asyncio.sleep(args.interval)
+            polls += 1
+            start = time.perf_counter()
+            try:
+                shadow = await api.get_device_status(args.device_id, product_id)
+            except MSPAAPIException as e:
+                print(json.dumps({"time": time.time(), "error": str(e)}), flush=True)
+                continue
+            print(json.dumps({
+                "time": time.time(),
+                "latency": round(time.perf_counter() - start, 4),
+                "shadow": shadow,
+            }), flush=True)
+
+
+async def _command(args) -> None:
+    desired = _parse_state(args.state)
+    async with _client(args) as api:
+        product_id = await _product_id(api, args.device_id, args.product_id)
+        _print_json(await api.send_device_command(desired, args.device_id, product_id))
+
+
+async def _serve(args) -> None:
+    server = StandInServer(
+        devices=args.devices,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        hang=args.hang,
+    )
+    url = await server.start(args.host, args.port)
+    print(f"Serving the MSpa stand-in at {url} (any username and password)", flush=True)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+
+async def _virtual_client(args, session, device: dict, stop_at: float, latencies: list[float], errors: Counter) -> None:
+    """Poll one device until stop_at, at args.rate requests/s when set."""
+    api = _client(args, session=session)
+    next_at = time.monotonic()
+    while True:
+        if args.rate:
+            next_at += 1 / args.rate
+        start = time.monotonic()
+        if start >= stop_at:
+            return
+        try:
+            with api.deadline(args.timeout):
+                await api.get_device_status(device["device_id"], device["product_id"])
+        except MSPAAPIException as e:
+            errors[type(e).__name__ if not str(e) else str(e)] += 1
+        else:
+            latencies.append(time.monotonic() - start)
+        if args.rate:
+            await asyncio.sleep(max(0.0, next_at - time.monotonic()))
+
+
+async def _soak(args) -> None:
+    server = None
+    if args.standin:
+        server = StandInServer(devices=args.clients, latency=args.latency, jitter=args.jitter, error_rate=args.error_rate)
+        args.base_url = await server.start()
+        args.username = args.username or "soak"
+        args.password = args.password or "soak"
+    try:
+        async with ClientSession(connector=TCPConnector(limit=args.clients)) as session:
+            async with _client(args, session=session) as api:
+                devices = await api.get_user_devices()
+            if args.device_id:
+                devices = [device for device in devices if device["device_id"] == args.device_id]
+            if not devices:
+                raise SystemExit("No devices to poll")
+            latencies: list[float] = []
+            errors: Counter = Counter()
+            start = time.monotonic()
+            await asyncio.gather(*(
+                _virtual_client(args, session, devices[index % len(devices)], start + args.duration, latencies, errors)
+                for index in range(args.clients)
+            ))
+            elapsed = time.monotonic() - start
+    finally:
+        if server is not None:
+            await server.stop()
+
+    ordered = sorted(latencies)
+    total = len(ordered) + sum(errors.values())
+    report = {
+        "base_url": args.base_url,
+        "clients": args.clients,
+        "duration": round(elapsed, 3),
+        "requests": total,
+        "throughput": round(total / elapsed, 2) if elapsed else None,
+        "error_rate": round(sum(errors.values()) / total, 4) if total else None,
+        "errors": dict(errors),
+        "latency": {
+            name: None if value is None else round(value, 4)
+            for name, value in (
+                ("p50", _percentile(ordered, 0.50)),
+                ("p90", _percentile(ordered, 0.90)),
+                ("p99", _percentile(ordered, 0.99)),
+                ("max", ordered[-1] if ordered else None),
+            )
+        },
+    }
+    _print_json(report)
+
+
+async def _teardown(args) -> None:
+    """Time closing clients whose requests hang on a stalled stand-in."""
+    server = StandInServer(devices=args.clients, hang=True)
+    args.base_url = await server.start()
+    args.username = args.username or "teardown"
+    args.password = args.password or "teardown"
+    outcomes: Counter = Counter()
+    close_times: list[float] = []
+    release_times: list[float] = []
+    try:
+        async with ClientSession(connector=TCPConnector(limit=0)) as session:
+            for _ in range(args.rounds):
+                server.stalled = 0
+                apis = [_client(args, session=session) for _ in range(args.clients)]
+                for api, device in zip(apis, server.devices):
+                    await api.login()
+                callers = [
+                    asyncio.ensure_future(api.get_device_status(device["device_id"], device["product_id"]))
+                    for api, device in zip(apis, server.devices)
+                    for _ in range(args.requests)
+                ]
+                # Wait until every request is stuck on the stand-in
+                while server.stalled < len(callers):
+                    await asyncio.sleep(0.01)
+                start = time.monotonic()
+                await asyncio.gather(*(api.close() for api in apis))
+                close_times.append(time.monotonic() - start)
+                results = await asyncio.gather(*callers, return_exceptions=True)
+                release_times.append(time.monotonic() - start)
+                outcomes.update(type(result).__name__ for result in results)
+    finally:
+        await server.stop()
+
+    _print_json({
+        "clients": args.clients,
+        "requests_per_client": args.requests,
+        "rounds": args.rounds,
+        "request_timeout": args.timeout,
+        "outcomes": dict(outcomes),
+        "close": {"p50": round(_percentile(sorted(close_times), 0.5), 4), "max": round(max(close_times), 4)},
+        "released": {"p50": round(_percentile(sorted(release_times), 0.5), 4), "max": round(max(release_times), 4)},
+    })
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Return the argument parser of the command line client."""
+    parser = argparse.ArgumentParser(prog="python -m custom_components.mspa", description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default=API_BASE_URL, help="API base URL (default: %(default)s)")
+    parser.add_argument("--username", default=os.environ.get("MSPA_USERNAME"))
+    parser.add_argument("--password", default=os.environ.get("MSPA_PASSWORD"))
+    parser.add_argument("--country", default="US", help="login region (default: %(default)s)")
+    parser.add_argument("--timeout", type=float, default=5, help="request timeout in seconds (default: %(default)s)")
+    parser.add_argument("--trace", action="store_true", help="print the timing spans of each request to stderr")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    login = commands.add_parser("login", help="log in and report the time taken")
+    login.add_argument("--show-token", action="store_true", help="print the access token")
+    login.set_defaults(handler=_login)
+
+    devices = commands.add_parser("devices", help="list the account's devices")
+    devices.set_defaults(handler=_devices)
+
+    poll = commands.add_parser("poll", help="poll a device's shadow as JSON lines")
+    poll.add_argument("device_id")
+    poll.add_argument("--product-id", help="looked up from the device list when omitted")
+    poll.add_argument("--interval", type=float, default=60, help="seconds between polls (default: %(default)s)")
+    poll.add_argument("--count", type=int, help="stop after this many polls")
+    poll.set_defaults(handler=_poll)
+
+    command = commands.add_parser("command", help="send a desired state, e.g. heater_state=1")
+    command.add_argument("device_id")
+    command.add_argument("state", nargs="+", metavar="key=value")
+    command.add_argument("--product-id", help="looked up from the device list when omitted")
+    command.set_defaults(handler=_command)
+
+    def add_standin_arguments(subparser):
+        subparser.add_argument("--latency", type=float, default=0.0, help="stand-in response delay in seconds")
+        subparser.add_argument("--jitter", type=float, default=0.0, help="extra random stand-in delay, up to this many seconds")
+        subparser.add_argument("--error-rate", type=float, default=0.0, help="fraction of stand-in requests answered with HTTP 500")
+
+    serve = commands.add_parser("serve", help="run a local stand-in of the cloud API")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8080)
+    serve.add_argument("--devices", type=int, default=1, help="number of fake spas (default: %(default)s)")
+    serve.add_argument("--hang", action="store_true", help="never answer shadow and command requests")
+    add_standin_arguments(serve)
+    serve.set_defaults(handler=_serve)
+
+    soak = commands.add_parser("soak", help="poll with many concurrent clients and report latency and errors")
+    soak.add_argument("--clients", type=int, default=10, help="concurrent virtual clients (default: %(default)s)")
+    soak.add_argument("--duration", type=float, default=30, help="seconds to run (default: %(default)s)")
+    soak.add_argument("--rate", type=float, help="requests per second per client (default: back to back)")
+    soak.add_argument("--device-id", help="poll only this device (default: spread over all)")
+    soak.add_argument("--standin", action="store_true", help="start a local stand-in with one spa per client and soak it")
+    add_standin_arguments(soak)
+    soak.set_defaults(handler=_soak)
+
+    teardown = commands.add_parser("teardown", help="time closing clients while the stand-in hangs their requests")
+    teardown.add_argument("--clients", type=int, default=10, help="clients, each with its own spa (default: %(default)s)")
+    teardown.add_argument("--requests", type=int, default=4, help="hanging requests per client (default: %(default)s)")
+    teardown.add_argument("--rounds", type=int, default=5, help="close rounds to time (default: %(default)s)")
+    teardown.set_defaults(handler=_teardown)
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Run the command line client."""
+    args = build_parser().parse_args(argv)
+    # Every client the command creates shares the tracer
+    args.tracer = tracer = Tracer() if args.trace else None
+    try:
+        asyncio.run(args.handler(args))
+    except KeyboardInterrupt:
+        return 130
+    except MSPAAPIException as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if tracer is not None:
+            for span in tracer.spans():
+                print(json.dumps(span, default=str), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,50 @@
+"""Device capability detection for the MSpa integration."""
+
+from __future__ import annotations
+
+from .const import ALL_CAPABILITIES
+
+# Turning the filter off forces these off as well (see switch.py).
+FILTER_DEPENDENTS = ("heater_state", "ozone_state", "uvc_state")
+# Turning these on forces the filter on.
+FILTER_REQUIRED_BY = ("heater_state", "uvc_state")
+
+
+def learn_capabilities(shadow: dict | None) -> frozenset[str] | None:
+    """Return the supported keys a device reports in its thing_shadow.
+
+    Returns None when the shadow reports none of them (device offline or
+    not polled yet), as that says nothing about the device.
+    """
+    reported = ALL_CAPABILITIES.intersection(shadow or {})
+    return frozenset(reported) if reported else None
+
+
+def get_capabilities(shadow: dict | None) -> frozenset[str]:
+    """Return the capabilities learned from a shadow, or the full set.
+
+    The full set is the fallback for devices nothing was learned about yet,
+    so nothing that used to be created disappears.
+    """
+    return learn_capabilities(shadow) or ALL_CAPABILITIES
+
+
+def filter_desired_state(desired_state: dict, capabilities: frozenset[str]) -> dict:
+    """Drop command keys the device does not support."""
+    return {key: value for key, value in desired_state.items() if key in capabilities}
+
+
+def merge_desired_state(pending: dict, desired_state: dict, capabilities: frozenset[str]) -> dict:
+    """Collapse a newer command into a pending one, keeping the final values.
+
+    The newer command wins per key and the filter dependency rules are
+    re-applied, so a queued "heater on" followed by "filter off" leaves
+    both off.
+    """
+    merged = {**pending, **desired_state}
+    if desired_state.get("filter_state") == 0:
+        for dep in FILTER_DEPENDENTS:
+            merged[dep] = 0
+    elif any(desired_state.get(key) == 1 for key in FILTER_REQUIRED_BY):
+        merged["filter_state"] = 1
+    return filter_desired_state(merged, capabilities)
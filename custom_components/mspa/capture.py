@@ -0,0 +1,227 @@
+"""Traffic capture and replay for the MSpa API client."""
+
+from __future__ import annotations
+
+import asyncio
+import gzip
+import hashlib
+import hmac
+import json
+import logging
+import os
+import secrets
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from aiohttp import ClientError
+
+_LOGGER = logging.getLogger(__name__)
+
+# Exchanges are written by a background thread in batches of FLUSH_LINES,
+# or sooner once FLUSH_INTERVAL has passed since the last batch
+FLUSH_LINES = 50
+FLUSH_INTERVAL = 60  # seconds
+# Recording stops once the capture file reaches this size on disk
+MAX_CAPTURE_BYTES = 10_000_000
+
+# Request/response fields replaced by SCRUBBED before anything is written
+SCRUB_KEYS = frozenset({
+    "account",
+    "password",
+    "authorization",
+    "sign",
+    "nonce",
+    "token",
+    "access_token",
+    "registration_id",
+    "mac",
+    "sn",
+})
+SCRUBBED = "***"
+# Identifiers replaced by a pseudonym that is stable within one capture, so
+# a replay still tells devices apart without revealing them
+PSEUDONYM_KEYS = frozenset({"device_id", "product_id"})
+
+
+def _pseudonym(key: str, value, salt: bytes | None) -> str:
+    if salt is None or value is None:
+        return SCRUBBED
+    digest = hmac.new(salt, str(value).encode(), hashlib.sha256).hexdigest()
+    return f"{key}-{digest[:12]}"
+
+
+def scrub(value, salt: bytes | None = None):
+    """Return a copy of value with credentials, tokens and identifiers replaced.
+
+    Identifiers get a salted pseudonym when salt is given and are scrubbed
+    like credentials otherwise.
+    """
+    if isinstance(value, dict):
+        scrubbed = {}
+        for key, item in value.items():
+            if key.lower() in SCRUB_KEYS:
+                scrubbed[key] = SCRUBBED
+            elif key.lower() in PSEUDONYM_KEYS:
+                scrubbed[key] = _pseudonym(key.lower(), item, salt)
+            else:
+                scrubbed[key] = scrub(item, salt)
+        return scrubbed
+    if isinstance(value, list):
+        return [scrub(item, salt) for item in value]
+    return value
+
+
+def _open(path: str, mode: str):
+    """Open a capture file, gzip-compressed when it ends in .gz."""
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+class TrafficRecorder:
+    """Append scrubbed request/response exchanges to a JSON-lines file.
+
+    Each line holds the offset since capture start, method, path, request
+    payload, status, response body (or transport error) and elapsed time.
+    The file is opened here, so create it outside the event loop; record()
+    only queues lines, which a single writer thread appends in batches
+    until the file reaches max_bytes.
+    """
+
+    def __init__(self, path: str, max_bytes: int = MAX_CAPTURE_BYTES):
+        """Open path for appending."""
+        self.path = path
+        self._file = _open(path, "a")
+        self._start = time.monotonic()
+        self._salt = secrets.token_bytes(16)
+        self._max_bytes = max_bytes
+        self._full = _file_size(self._file) >= max_bytes
+        self._pending: list[str] = []
+        self._flushed_at = self._start
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="mspa_capture")
+
+    @property
+    def full(self) -> bool:
+        """Return True once the size cap stopped the capture."""
+        return self._full
+
+    def record(self, method: str, path: str, payload, status: int | None, response, elapsed: float, error: str | None = None) -> None:
+        """Queue one exchange for writing."""
+        if self._file is None or self._full:
+            return
+        exchange = {
+            "t": round(time.monotonic() - self._start - elapsed, 4),
+            "method": method,
+            "path": path,
+            "request": scrub(payload, self._salt),
+            "elapsed": round(elapsed, 4),
+        }
+        if error is None:
+            exchange["status"] = status
+            exchange["response"] = scrub(response, self._salt)
+        else:
+            exchange["error"] = error
+        self._pending.append(json.dumps(exchange, separators=(",", ":")) + "\n")
+        if len(self._pending) >= FLUSH_LINES or time.monotonic() - self._flushed_at >= FLUSH_INTERVAL:
+            self._submit()
+
+    def _submit(self) -> None:
+        """Hand the queued lines to the writer thread."""
+        if self._pending:
+            self._writer.submit(self._write, self._file, "".join(self._pending))
+            self._pending = []
+        self._flushed_at = time.monotonic()
+
+    def _write(self, capture, text: str) -> None:
+        """Append one batch; runs on the writer thread."""
+        if self._full:
+            return
+        capture.write(text)
+        capture.flush()
+        if _file_size(capture) >= self._max_bytes:
+            self._full = True
+            _LOGGER.warning("MSpa capture %s reached %s bytes, recording stopped", self.path, self._max_bytes)
+
+    def close(self, wait: bool = False) -> None:
+        """Write what is queued and close the capture file.
+
+        Returns at once unless wait is True, which blocks until the file is
+        closed and so must not be used in the event loop.
+        """
+        if self._file is None:
+            return
+        self._submit()
+        self._writer.submit(self._file.close)
+        self._file = None
+        self._writer.shutdown(wait=wait)
+
+
+def _file_size(capture) -> int:
+    """Return the on-disk (compressed, for .gz) size of an open capture file."""
+    return os.fstat(capture.fileno()).st_size
+
+
+def load_capture(path: str) -> list[dict]:
+    """Read every exchange of a capture file."""
+    with _open(path, "r") as capture:
+        return [json.loads(line) for line in capture if line.strip()]
+
+
+class ReplayError(ClientError):
+    """The replayed capture has no matching exchange left."""
+
+
+class _ReplayResponse:
+    def __init__(self, status: int, body):
+        self.status = status
+        self._body = body
+
+    async def json(self, **kwargs):
+        return self._body
+
+
+class ReplayTransport:
+    """Session stand-in that plays a capture back into MSPAAPI.
+
+    Pass it as ``session=``. Exchanges are served in recorded order and must
+    match the request's method and path. ``speed`` scales the recorded
+    latency (1.0 is real time); 0 replays as fast as possible.
+    """
+
+    def __init__(self, exchanges: list[dict], speed: float = 1.0):
+        """Initialize from exchanges returned by load_capture()."""
+        self._exchanges = list(exchanges)
+        self._position = 0
+        self._speed = speed
+        self.closed = False
+
+    @classmethod
+    def from_file(cls, path: str, speed: float = 1.0) -> "ReplayTransport":
+        """Load a capture file for replay."""
+        return cls(load_capture(path), speed)
+
+    @property
+    def remaining(self) -> int:
+        """Return the number of exchanges not yet replayed."""
+        return len(self._exchanges) - self._position
+
+    async def request(self, method: str, url: str, **kwargs) -> _ReplayResponse:
+        """Serve the next recorded exchange."""
+        if self._position >= len(self._exchanges):
+            raise ReplayError("Capture exhausted")
+        exchange = self._exchanges[self._position]
+        if exchange["method"] != method or not url.endswith("/" + exchange["path"].lstrip("/")):
+            raise ReplayError(f"Expected {exchange['method']} {exchange['path']}, got {method} {url}")
+        self._position += 1
+        if self._speed:
+            await asyncio.sleep(exchange["elapsed"] / self._speed)
+        error = exchange.get("error")
+        if error == "TimeoutError":
+            raise asyncio.TimeoutError()
+        if error is not None:
+            raise ClientError(error)
+        return _ReplayResponse(exchange["status"], exchange["response"])
+
+    async def close(self) -> None:
+        """Mark the transport closed."""
+        self.closed = True
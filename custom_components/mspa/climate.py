@@ -10,11 +10,11 @@ from homeassistant.components.climate import (
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import UnitOfTemperature
 from homeassistant.core import HomeAssistant
-from homeassistant.helpers.update_coordinator import CoordinatorEntity
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
-from .const import DOMAIN, API_BASE_URL
-from .mspaapi import MSPAAPI, MSPAAPIException
+from .const import COMMAND_ACCEPTED, DOMAIN, API_BASE_URL
+from .entity import MSpaEntity
+from .mspaapi import MSPAAPIException
 
 if TYPE_CHECKING:
     from . import MSPADataUpdateCoordinator
@@ -29,27 +29,29 @@ async def async_setup_entry(
     async_add_entities: AddEntitiesCallback,
 ) -> None:
     """Set up the MSpa climate platform."""
-    # Get shared coordinator and API from hass.data
+    # Get shared coordinator from hass.data
     data = hass.data[DOMAIN][config_entry.entry_id]
     coordinator = data["coordinator"]
-    api = data["api"]
 
     async_add_entities([
-        MSpaClimate(coordinator, api),
+        MSpaClimate(coordinator, device)
+        for device in coordinator.devices.values()
+        if "temperature_setting" in device["capabilities"]
     ])
 
 
 
 
-class MSpaClimate(CoordinatorEntity, ClimateEntity):
+class MSpaClimate(MSpaEntity, ClimateEntity):
     """Representation of a MSpa climate control."""
 
-    def __init__(self, coordinator: "MSPADataUpdateCoordinator", api: MSPAAPI):
+    _publish_keys = ("water_temperature", "temperature_setting", "heater_state", "temperature_unit")
+
+    def __init__(self, coordinator: "MSPADataUpdateCoordinator", device: dict):
         """Initialize the MSpa climate control."""
-        super().__init__(coordinator)
-        self._api = api
-        self._attr_name = "MSpa Temperature"
-        self._attr_unique_id = f"mspa_{api.device_id}_climate"
+        super().__init__(coordinator, device)
+        self._attr_name = "Temperature"
+        self._attr_unique_id = f"mspa_{self._device_id}_climate"
         self._attr_icon = "mdi:hot-tub"
         
         # Climate entity features
@@ -68,7 +70,7 @@ class MSpaClimate(CoordinatorEntity, ClimateEntity):
     def temperature_unit(self) -> str:
         """Return the unit of measurement."""
         # Check if device is set to Fahrenheit (1) or Celsius (0)
-        temp_unit = self.coordinator.data.get("temperature_unit", 0)
+        temp_unit = self.device_data.get("temperature_unit", 0)
         return UnitOfTemperature.FAHRENHEIT if temp_unit == 1 else UnitOfTemperature.CELSIUS
 
     @property
@@ -95,12 +97,12 @@ class MSpaClimate(CoordinatorEntity, ClimateEntity):
     @property
     def current_temperature(self) -> float | None:
         """Return the current temperature."""
-        if "water_temperature" in self.coordinator.data:
+        if "water_temperature" in self.device_data:
             # API returns doubled Celsius values, so divide by 2 to get actual Celsius
-            temp_celsius = self.coordinator.data["water_temperature"] * 0.5
+            temp_celsius = self.device_data["water_temperature"] * 0.5
             
             # Convert to Fahrenheit if device is set to Fahrenheit
-            if self.coordinator.data.get("temperature_unit", 0) == 1:
+            if self.device_data.get("temperature_unit", 0) == 1:
                 return round(temp_celsius * 9/5 + 32, 1)
             return round(temp_celsius, 1)
         return None
@@ -108,12 +110,12 @@ class MSpaClimate(CoordinatorEntity, ClimateEntity):
     @property
     def target_temperature(self) -> float | None:
         """Return the temperature we try to reach."""
-        if "temperature_setting" in self.coordinator.data:
+        if "temperature_setting" in self.device_data:
             # API returns doubled Celsius values, so divide by 2 to get actual Celsius
-            temp_celsius = self.coordinator.data["temperature_setting"] * 0.5
+            temp_celsius = self.device_data["temperature_setting"] * 0.5
             
             # Convert to Fahrenheit if device is set to Fahrenheit
-            if self.coordinator.data.get("temperature_unit", 0) == 1:
+            if self.device_data.get("temperature_unit", 0) == 1:
                 return round(temp_celsius * 9/5 + 32, 1)
             return round(temp_celsius, 1)
         return None
@@ -121,14 +123,9 @@ class MSpaClimate(CoordinatorEntity, ClimateEntity):
     @property
     def hvac_mode(self) -> HVACMode:
         """Return current operation mode."""
-        heater_state = self.coordinator.data.get("heater_state", 0)
+        heater_state = self.device_data.get("heater_state", 0)
         return HVACMode.HEAT if heater_state == 1 else HVACMode.OFF
 
-    @property
-    def available(self) -> bool:
-        """Return True if entity is available."""
-        return bool(self.coordinator.data)
-
     async def async_set_temperature(self, **kwargs: Any) -> None:
         """Set new target temperature."""
         temperature = kwargs.get("temperature")
@@ -149,13 +146,13 @@ class MSpaClimate(CoordinatorEntity, ClimateEntity):
             api_temp_value = int(temp_celsius * 2)
 
             desired_state = {"temperature_setting": api_temp_value}
-            response = await self._api.send_device_command(desired_state)
+            response = await self.coordinator.async_send_command(self._device_id, desired_state)
             _LOGGER.debug(f"MSpa temperature command response: {response}")
 
-            if response.get("code") == 0 and response.get("message") == "SUCCESS":
+            if response.get("code") == 0 and response.get("message") in COMMAND_ACCEPTED:
                 # Optimistic update - immediately update coordinator data
-                if hasattr(self.coordinator, 'data') and self.coordinator.data:
-                    self.coordinator.data["temperature_setting"] = api_temp_value
+                if self.device_data:
+                    self.device_data["temperature_setting"] = api_temp_value
                     self.coordinator.async_set_updated_data(self.coordinator.data)
                 _LOGGER.debug("Optimistically updated temperature setting.")
             else:
@@ -177,14 +174,14 @@ class MSpaClimate(CoordinatorEntity, ClimateEntity):
                 _LOGGER.warning(f"Unsupported HVAC mode: {hvac_mode}")
                 return
 
-            response = await self._api.send_device_command(desired_state)
+            response = await self.coordinator.async_send_command(self._device_id, desired_state)
             _LOGGER.debug(f"MSpa HVAC command response: {response}")
 
-            if response.get("code") == 0 and response.get("message") == "SUCCESS":
+            if response.get("code") == 0 and response.get("message") in COMMAND_ACCEPTED:
                 # Optimistic update - immediately update coordinator data
-                if hasattr(self.coordinator, 'data') and self.coordinator.data:
+                if self.device_data:
                     for key, value in desired_state.items():
-                        self.coordinator.data[key] = value
+                        self.device_data[key] = value
                     self.coordinator.async_set_updated_data(self.coordinator.data)
                 _LOGGER.debug("Optimistically updated HVAC mode.")
             else:
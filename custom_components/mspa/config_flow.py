@@ -1,27 +1,123 @@
 from __future__ import annotations
 
+import asyncio
 import logging
+import time
 
 import voluptuous as vol
 
 from homeassistant import config_entries
-from .const import DOMAIN, API_BASE_URL
+from homeassistant.core import callback
+from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from .const import (
+    DOMAIN,
+    API_BASE_URL,
+    CONF_CAPTURE,
+    CONF_EXTRA_DEVICES,
+    CONF_PUBLISH_DEADBAND,
+    CONF_PUBLISH_HEARTBEAT,
+    CONF_PUBLISH_MIN_INTERVAL,
+    CONF_THRESHOLDS,
+    CONF_TRACE,
+    DEFAULT_PUBLISH_POLICIES,
+    FLOW_STEP_BUDGET,
+    MAX_CONCURRENT_FETCHES,
+    MODE_ACCOUNT,
+    MODE_DEVICE,
+)
 from .mspaapi import MSPAAPI, MSPAAPIException
 
 
 
 _LOGGER = logging.getLogger(__name__)
 
+# Device picker choice that imports every device on the account
+ALL_DEVICES = "__all__"
+
+# Deadline for probing every discovered device's thing_shadow
+PROBE_TIMEOUT = 10  # seconds
+
+
+async def async_probe_devices(api: MSPAAPI, devices: list[dict], timeout: float = PROBE_TIMEOUT) -> None:
+    """Read every device's thing_shadow concurrently within one deadline.
+
+    Each device dict gains "reachable" and "latency_ms"; devices that have
+    not answered when the deadline passes are left unreachable.
+    """
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_FETCHES)
+
+    async def probe(device: dict) -> None:
+        async with semaphore:
+            start = time.monotonic()
+            try:
+                await api.get_device_status(device["device_id"], device["product_id"])
+            except MSPAAPIException as e:
+                _LOGGER.debug("MSpa device %s unreachable: %s", device["device_id"], e)
+                return
+            device["reachable"] = True
+            device["latency_ms"] = round((time.monotonic() - start) * 1000)
+
+    for device in devices:
+        device["reachable"] = False
+        device["latency_ms"] = None
+    try:
+        await asyncio.wait_for(asyncio.gather(*(probe(device) for device in devices)), timeout)
+    except asyncio.TimeoutError:
+        _LOGGER.debug("MSpa device probe deadline of %ss passed", timeout)
+
+
+def device_label(device: dict) -> str:
+    """Describe a discovered device for a picker, with live reachability."""
+    status = "Online" if device["is_online"] else "Offline"
+    if device.get("reachable"):
+        reachability = f"reachable, {device['latency_ms']} ms"
+    else:
+        reachability = "not reachable"
+    return f"{device['name']} ({device['product_model']}) - {status}, {reachability}"
+
+
+def configured_device_ids(hass) -> set[str]:
+    """Return the devices single-device entries already cover, added spas included."""
+    device_ids = set()
+    for entry in hass.config_entries.async_entries(DOMAIN):
+        if entry.data.get("mode", MODE_DEVICE) == MODE_DEVICE:
+            device_ids.add(entry.data["device_id"])
+            device_ids.update(device["device_id"] for device in entry.options.get(CONF_EXTRA_DEVICES, []))
+    return device_ids
+
+
+def device_entry_data(device: dict) -> dict:
+    """Return the fields a config entry keeps for a device."""
+    return {
+        "device_id": device["device_id"],
+        "product_id": device["product_id"],
+        "product_model": device["product_model"],
+        "device_name": device["name"],
+    }
+
 
 class MSPAConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     """Config flow for MSpa integration."""
 
     VERSION = 1
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry):
+        """Return the options flow for this handler."""
+        return MSPAOptionsFlow(config_entry)
+
     def __init__(self):
         """Initialize the config flow."""
         self.discovered_devices = None
         self.selected_device = None
+        # False when some of the account's spas already have an entry
+        self._offer_all_devices = True
+        self._username = None
+        self._password = None
+        # Cached from discovery so later steps and setup skip another login
+        self._access_token = None
 
     async def async_step_user(self, user_input=None):
         """Handle the user step of the config flow."""
@@ -34,20 +130,32 @@ class MSPAConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             # Test authentication and discover devices
             try:
                 _LOGGER.info("Attempting login and device discovery")
-                api = MSPAAPI(
+                async with MSPAAPI(
                     base_url=API_BASE_URL,
+                    session=async_get_clientsession(self.hass),
                     username=username,
                     password=password
-                )
-                
-                # Authenticate with username/password
-                _LOGGER.info("Attempting login with username/password")
-                await api.login()
-                
-                # Discover devices
-                devices = await api.get_user_devices()
-                await api.close()
-                
+                ) as api, api.deadline(FLOW_STEP_BUDGET):
+                    # Authenticate with username/password
+                    _LOGGER.info("Attempting login with username/password")
+                    await api.login()
+
+                    # Discover devices and check each one answers
+                    devices = await api.get_user_devices()
+                    await async_probe_devices(api, devices)
+                    access_token = api.access_token
+
+                # An account entry already covers every spa on the account
+                if any(entry.unique_id == f"account_{username}" for entry in self._async_current_entries()):
+                    return self.async_abort(reason="already_configured")
+                # Spas that have an entry would collide on their entities' unique IDs
+                configured = configured_device_ids(self.hass)
+                self._offer_all_devices = not any(device["device_id"] in configured for device in devices)
+                if devices and not self._offer_all_devices:
+                    devices = [device for device in devices if device["device_id"] not in configured]
+                    if not devices:
+                        return self.async_abort(reason="already_configured")
+
                 if not devices:
                     _LOGGER.error("No devices found for this account")
                     errors["base"] = "no_devices"
@@ -57,14 +165,17 @@ class MSPAConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                     data = {
                         "username": username,
                         "password": password,
-                        "device_id": device["device_id"],
-                        "product_id": device["product_id"],
-                        "device_name": device["name"]
+                        "access_token": access_token,
+                        "mode": MODE_DEVICE,
+                        **device_entry_data(device),
                     }
                     return self.async_create_entry(title=f"MSpa {device['name']}", data=data)
                 else:
                     # Multiple devices, show selection step
                     self.discovered_devices = devices
+                    self._username = username
+                    self._password = password
+                    self._access_token = access_token
                     return await self.async_step_device_selection()
                     
             except MSPAAPIException as e:
@@ -99,23 +210,36 @@ class MSPAConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         """Handle device selection when multiple devices are found."""
         if user_input is not None:
             device_id = user_input["device"]
+            if device_id == ALL_DEVICES:
+                # One entry and one coordinator for every device on the account
+                await self.async_set_unique_id(f"account_{self._username}")
+                self._abort_if_unique_id_configured()
+                data = {
+                    "username": self._username,
+                    "password": self._password,
+                    "access_token": self._access_token,
+                    "mode": MODE_ACCOUNT,
+                }
+                return self.async_create_entry(title=f"MSpa {self._username}", data=data)
+
             # Find the selected device
             selected_device = next((d for d in self.discovered_devices if d["device_id"] == device_id), None)
             if selected_device:
                 data = {
-                    "username": user_input.get("username", ""),
-                    "password": user_input.get("password", ""),
-                    "device_id": selected_device["device_id"],
-                    "product_id": selected_device["product_id"],
-                    "device_name": selected_device["name"]
+                    "username": self._username,
+                    "password": self._password,
+                    "access_token": self._access_token,
+                    "mode": MODE_DEVICE,
+                    **device_entry_data(selected_device),
                 }
                 return self.async_create_entry(title=f"MSpa {selected_device['name']}", data=data)
 
         # Create device selection options
         device_options = {}
+        if self._offer_all_devices:
+            device_options[ALL_DEVICES] = f"All devices ({len(self.discovered_devices)})"
         for device in self.discovered_devices:
-            status = "Online" if device["is_online"] else "Offline"
-            device_options[device["device_id"]] = f"{device['name']} ({device['product_model']}) - {status}"
+            device_options[device["device_id"]] = device_label(device)
 
         data_schema = vol.Schema(
             {
@@ -129,4 +253,120 @@ class MSPAConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             description_placeholders={
                 "device": "Select your MSpa device",
             },
-        )
\ No newline at end of file
+        )
+
+
+class MSPAOptionsFlow(config_entries.OptionsFlow):
+    """Options flow for MSpa integration."""
+
+    def __init__(self, config_entry):
+        """Initialize the options flow."""
+        self._entry = config_entry
+        self._candidates: list[dict] = []
+
+    async def async_step_init(self, user_input=None):
+        """Choose between general settings and adding spas."""
+        return self.async_show_menu(step_id="init", menu_options=["settings", "add_devices"])
+
+    async def async_step_settings(self, user_input=None):
+        """Manage polling thresholds, water temperature publishing, capture and tracing."""
+        errors = {}
+
+        if user_input is not None:
+            try:
+                thresholds = sorted(
+                    float(value)
+                    for value in user_input.get(CONF_THRESHOLDS, "").split(",")
+                    if value.strip()
+                )
+            except ValueError:
+                errors[CONF_THRESHOLDS] = "invalid_thresholds"
+            else:
+                return self.async_create_entry(
+                    title="",
+                    data={
+                        **self._entry.options,
+                        CONF_THRESHOLDS: thresholds,
+                        CONF_PUBLISH_DEADBAND: user_input[CONF_PUBLISH_DEADBAND],
+                        CONF_PUBLISH_MIN_INTERVAL: user_input[CONF_PUBLISH_MIN_INTERVAL],
+                        CONF_PUBLISH_HEARTBEAT: user_input[CONF_PUBLISH_HEARTBEAT],
+                        CONF_CAPTURE: user_input.get(CONF_CAPTURE, False),
+                        CONF_TRACE: user_input.get(CONF_TRACE, False),
+                    },
+                )
+
+        current = ", ".join(f"{value:g}" for value in self._entry.options.get(CONF_THRESHOLDS, []))
+        options = self._entry.options
+        water = DEFAULT_PUBLISH_POLICIES["water_temperature"]
+        data_schema = vol.Schema(
+            {
+                vol.Optional(CONF_THRESHOLDS, default=current): str,
+                vol.Required(
+                    CONF_PUBLISH_DEADBAND,
+                    default=options.get(CONF_PUBLISH_DEADBAND, water["deadband"]),
+                ): vol.All(vol.Coerce(float), vol.Range(min=0)),
+                vol.Required(
+                    CONF_PUBLISH_MIN_INTERVAL,
+                    default=options.get(CONF_PUBLISH_MIN_INTERVAL, water["min_interval"]),
+                ): vol.All(vol.Coerce(int), vol.Range(min=0)),
+                vol.Required(
+                    CONF_PUBLISH_HEARTBEAT,
+                    default=options.get(CONF_PUBLISH_HEARTBEAT, water["heartbeat"]),
+                ): vol.All(vol.Coerce(int), vol.Range(min=60)),
+                vol.Optional(CONF_CAPTURE, default=self._entry.options.get(CONF_CAPTURE, False)): bool,
+                vol.Optional(CONF_TRACE, default=self._entry.options.get(CONF_TRACE, False)): bool,
+            }
+        )
+
+        return self.async_show_form(
+            step_id="settings",
+            data_schema=data_schema,
+            errors=errors,
+        )
+
+    async def async_step_add_devices(self, user_input=None):
+        """Add more spas from the account to a single-device entry.
+
+        Discovery reuses the running entry's logged-in client, so no new
+        login is made.
+        """
+        if self._entry.data.get("mode") == MODE_ACCOUNT:
+            return self.async_abort(reason="all_devices_included")
+        entry_data = self.hass.data.get(DOMAIN, {}).get(self._entry.entry_id)
+        if entry_data is None:
+            return self.async_abort(reason="not_loaded")
+        extra_devices = self._entry.options.get(CONF_EXTRA_DEVICES, [])
+
+        if user_input is not None:
+            chosen = set(user_input.get("devices", []))
+            added = [device_entry_data(device) for device in self._candidates if device["device_id"] in chosen]
+            return self.async_create_entry(
+                title="",
+                data={**self._entry.options, CONF_EXTRA_DEVICES: extra_devices + added},
+            )
+
+        api = entry_data["api"]
+        known = {self._entry.data["device_id"], *(device["device_id"] for device in extra_devices)}
+        with api.deadline(FLOW_STEP_BUDGET):
+            try:
+                devices = await api.get_user_devices()
+            except MSPAAPIException as e:
+                _LOGGER.error("Unable to list MSpa devices: %s", e)
+                return self.async_abort(reason="cannot_connect")
+            self._candidates = [device for device in devices if device["device_id"] not in known]
+            if not self._candidates:
+                return self.async_abort(reason="no_new_devices")
+            await async_probe_devices(api, self._candidates)
+
+        data_schema = vol.Schema(
+            {
+                vol.Required("devices"): cv.multi_select(
+                    {device["device_id"]: device_label(device) for device in self._candidates}
+                ),
+            }
+        )
+
+        return self.async_show_form(
+            step_id="add_devices",
+            data_schema=data_schema,
+        )
@@ -4,9 +4,63 @@ DOMAIN = "mspa"
 PLATFORMS = ["sensor","switch","climate","binary_sensor","button"]
 
 API_BASE_URL = "https://api.iot.the-mspa.com/api"
+# Candidate API hosts probed for latency; "country" sets the login region
+# for a host, which is otherwise "US" as the cloud has always been sent.
+# Only the documented host is listed; probing and failover stay idle until a
+# second, confirmed regional host is added here.
+API_ENDPOINTS = [
+    {"base_url": API_BASE_URL, "country": None},
+]
 DEVICE_STATUS_ENDPOINT = "device/thing_shadow"
 DEFAULT_NAME = "MSpa"
 
+# Entry data "mode": one device per entry (legacy) or every device on the account
+MODE_DEVICE = "device"
+MODE_ACCOUNT = "account"
+
+# Upper bound on concurrent thing_shadow requests per account
+MAX_CONCURRENT_FETCHES = 4
+
+# Deadline budgets (seconds) shared by every request an operation makes,
+# including auto-login and the retry after a token refresh. A refresh used
+# to stall for about 20 s (login, poll, re-login and retry at 5 s each);
+# its budget also caps the journal flush and device polls nested in it.
+REFRESH_BUDGET = 15
+DEVICE_POLL_BUDGET = 10
+COMMAND_BUDGET = 10
+FLOW_STEP_BUDGET = 20
+
+# Options: extra water temperatures (°C) whose crossing is polled for promptly
+CONF_THRESHOLDS = "thresholds"
+# Options: devices added to a single-device entry from the options flow
+CONF_EXTRA_DEVICES = "extra_devices"
+# Entry data: capabilities learned per device from a reported shadow, kept
+# across setups so a spa that starts offline does not fall back to all
+CONF_CAPABILITIES = "capabilities"
+
+# Shadow keys the API reports in doubled Celsius
+HALF_DEGREE_KEYS = ("water_temperature", "temperature_setting")
+
+# Publishing policies per key: a state is written when the value moves by
+# at least deadband (°C, °C/h or minutes), no more often than min_interval
+# and at least every heartbeat seconds. The water temperature policy can be
+# changed in the options flow.
+DEFAULT_PUBLISH_POLICIES = {
+    "water_temperature": {"deadband": 1.0, "min_interval": 60, "heartbeat": 1800},
+    "heating_rate": {"deadband": 0.2, "min_interval": 300, "heartbeat": 3600},
+    "time_to_target": {"deadband": 5, "min_interval": 60, "heartbeat": 1800},
+}
+CONF_PUBLISH_DEADBAND = "publish_deadband"
+CONF_PUBLISH_MIN_INTERVAL = "publish_min_interval"
+CONF_PUBLISH_HEARTBEAT = "publish_heartbeat"
+# Options: record every API exchange (scrubbed) to CAPTURE_FILE
+CONF_CAPTURE = "capture"
+CAPTURE_FILE = "mspa_capture_{entry_id}.jsonl.gz"
+# Options: time requests and refreshes as spans, kept in memory for the
+# diagnostics dump and written to the rotating TRACE_FILE
+CONF_TRACE = "trace"
+TRACE_FILE = "mspa_trace_{entry_id}.jsonl"
+
 HEADER = {
     "push_type": "Android",
     "authorization": "token API_KEY",
@@ -21,6 +75,26 @@ HEADER = {
     # ... other sensor definitions
 #}
 
+# Shadow keys backing each entity/command. A device only gets the entities
+# and command keys its first thing_shadow reports (see capabilities.py).
+ALL_CAPABILITIES = frozenset({
+    "heater_state",
+    "filter_state",
+    "bubble_state",
+    "bubble_level",
+    "ozone_state",
+    "uvc_state",
+    "safety_lock",
+    "temperature_unit",
+    "temperature_setting",
+    "water_temperature",
+})
+
+# Command responses entities treat as accepted; QUEUED means the command
+# is held in the offline journal until the cloud is reachable again
+COMMAND_QUEUED = "QUEUED"
+COMMAND_ACCEPTED = ("SUCCESS", COMMAND_QUEUED)
+
 STATES = {
     "ON": "1",
     "OFF": "0",
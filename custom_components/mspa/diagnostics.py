@@ -0,0 +1,42 @@
+"""Diagnostics support for the MSpa integration."""
+
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .capture import PSEUDONYM_KEYS, SCRUB_KEYS
+from .const import DOMAIN
+
+TO_REDACT = {*SCRUB_KEYS, *PSEUDONYM_KEYS, "username"}
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: ConfigEntry) -> dict[str, Any]:
+    """Return diagnostics for a config entry, including any recorded trace spans."""
+    data = hass.data[DOMAIN][entry.entry_id]
+    coordinator = data["coordinator"]
+    api = data["api"]
+
+    return {
+        "entry": {
+            "data": async_redact_data(dict(entry.data), TO_REDACT),
+            "options": async_redact_data(dict(entry.options), TO_REDACT),
+        },
+        "endpoint": api.base_url,
+        "devices": [
+            {
+                **async_redact_data({key: value for key, value in device.items() if key != "capabilities"}, TO_REDACT),
+                "capabilities": sorted(device["capabilities"]),
+                "shadow": async_redact_data((coordinator.data or {}).get(device_id, {}), TO_REDACT),
+                "report_interval": coordinator.cadence[device_id].interval,
+                "heating_rate": coordinator.telemetry[device_id].rate,
+            }
+            for device_id, device in coordinator.devices.items()
+        ],
+        "update_interval": coordinator.update_interval.total_seconds() if coordinator.update_interval else None,
+        "tracing": api.tracer.enabled,
+        "spans": api.tracer.spans(),
+    }
@@ -0,0 +1,106 @@
+"""Latency-probed endpoint selection for the MSpa API client."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+
+from aiohttp import ClientError, ClientTimeout
+
+PROBE_TIMEOUT = 3  # seconds
+# Consecutive transport failures that open the circuit to an endpoint
+FAILURE_THRESHOLD = 3
+# How long an open endpoint is skipped before it may be chosen again
+CIRCUIT_COOLDOWN = 300  # seconds
+
+
+class Endpoint:
+    """A candidate API base URL and the login region that goes with it."""
+
+    def __init__(self, base_url: str, country: str | None = None):
+        """Initialize an unprobed endpoint."""
+        self.base_url = base_url.rstrip("/")
+        self.country = country
+        self.latency: float | None = None
+        self.failures = 0
+        self.open_until = 0.0
+
+    @property
+    def closed_circuit(self) -> bool:
+        """Return True unless the endpoint's circuit is open."""
+        return time.monotonic() >= self.open_until
+
+    def __repr__(self) -> str:
+        return f"Endpoint({self.base_url!r}, latency={self.latency})"
+
+
+class EndpointSelector:
+    """Pick the lowest-latency healthy endpoint and fail over when it breaks."""
+
+    def __init__(self, endpoints: list[dict], failure_threshold: int = FAILURE_THRESHOLD, cooldown: float = CIRCUIT_COOLDOWN):
+        """Initialize with candidate dicts of base_url and optional country."""
+        if not endpoints:
+            raise ValueError("At least one endpoint is required")
+        self.endpoints = [Endpoint(**endpoint) for endpoint in endpoints]
+        self.current = self.endpoints[0]
+        self._failure_threshold = failure_threshold
+        self._cooldown = cooldown
+
+    async def _probe_one(self, session, endpoint: Endpoint, timeout: float) -> None:
+        """Time one round trip; any non-5xx answer counts as healthy."""
+        start = time.monotonic()
+        try:
+            async with session.get(endpoint.base_url, timeout=ClientTimeout(total=timeout)) as resp:
+                healthy = resp.status < 500
+        except (ClientError, asyncio.TimeoutError):
+            healthy = False
+        endpoint.latency = time.monotonic() - start if healthy else None
+
+    async def probe(self, session, timeout: float = PROBE_TIMEOUT) -> bool:
+        """Probe every candidate concurrently and switch to the fastest.
+
+        Returns True if the current endpoint changed.
+        """
+        if len(self.endpoints) < 2:
+            return False
+        await asyncio.gather(
+            *(self._probe_one(session, endpoint, timeout) for endpoint in self.endpoints)
+        )
+        candidates = [
+            endpoint for endpoint in self.endpoints
+            if endpoint.latency is not None and endpoint.closed_circuit
+        ]
+        if not candidates:
+            return False
+        best = min(candidates, key=lambda endpoint: endpoint.latency)
+        changed = best is not self.current
+        self.current = best
+        return changed
+
+    def record_success(self) -> None:
+        """Reset the failure count of the current endpoint."""
+        self.current.failures = 0
+
+    def record_failure(self) -> bool:
+        """Count a transport failure; open the circuit and fail over at the threshold.
+
+        Returns True if the current endpoint changed.
+        """
+        current = self.current
+        current.failures += 1
+        if current.failures < self._failure_threshold:
+            return False
+        current.failures = 0
+        current.open_until = time.monotonic() + self._cooldown
+        alternatives = [
+            endpoint for endpoint in self.endpoints
+            if endpoint is not current and endpoint.closed_circuit
+        ]
+        if not alternatives:
+            return False
+        # Prefer probed endpoints, fastest first
+        self.current = min(
+            alternatives,
+            key=lambda endpoint: (endpoint.latency is None, endpoint.latency or 0.0),
+        )
+        return True
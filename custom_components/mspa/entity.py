@@ -0,0 +1,101 @@
+"""Base entity for the MSpa integration."""
+
+from __future__ import annotations
+
+import time
+from typing import TYPE_CHECKING
+
+from homeassistant.core import callback
+from homeassistant.helpers.entity import DeviceInfo
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+
+from .const import DOMAIN, HALF_DEGREE_KEYS
+from .telemetry import PublishGate
+
+if TYPE_CHECKING:
+    from . import MSPADataUpdateCoordinator
+
+
+class MSpaEntity(CoordinatorEntity):
+    """Entity bound to one device of a (possibly multi-device) coordinator.
+
+    Entities that set _publish_keys only write a new state when
+    _publish_values() changes significantly under the coordinator's
+    publish policies; the coordinator itself still sees every sample.
+    """
+
+    # Friendly names are "<device name> <entity name>", so spas of one
+    # account can be told apart
+    _attr_has_entity_name = True
+    _publish_keys: tuple[str, ...] = ()
+
+    def __init__(self, coordinator: "MSPADataUpdateCoordinator", device: dict):
+        """Initialize the entity for the given device."""
+        super().__init__(coordinator)
+        self._device_id = device["device_id"]
+        self._capabilities = device["capabilities"]
+        self._attr_device_info = DeviceInfo(
+            identifiers={(DOMAIN, self._device_id)},
+            name=f"MSpa {device.get('name') or self._device_id}",
+            manufacturer="MSpa",
+            model=device.get("product_model"),
+        )
+        self._gate = PublishGate(coordinator.publish_policies)
+        self._published_available: bool | None = None
+        self._cancel_deferred = None
+
+    @property
+    def device_data(self) -> dict:
+        """Return the latest shadow of this entity's device."""
+        return (self.coordinator.data or {}).get(self._device_id, {})
+
+    @property
+    def available(self) -> bool:
+        """Return True if entity is available."""
+        return bool(self.device_data)
+
+    def _publish_values(self) -> dict:
+        """Return the values this entity's state is rendered from."""
+        values = {key: self.device_data.get(key) for key in self._publish_keys}
+        for key in HALF_DEGREE_KEYS:
+            # Compare temperatures in °C, the unit the policies are set in
+            if values.get(key) is not None:
+                values[key] = values[key] * 0.5
+        return values
+
+    async def async_will_remove_from_hass(self) -> None:
+        """Cancel a deferred publish."""
+        await super().async_will_remove_from_hass()
+        self._cancel_deferred_publish()
+
+    def _cancel_deferred_publish(self) -> None:
+        if self._cancel_deferred is not None:
+            self._cancel_deferred()
+            self._cancel_deferred = None
+
+    @callback
+    def _publish(self) -> None:
+        self._cancel_deferred_publish()
+        self._gate.published(self._publish_values(), time.monotonic())
+        self._published_available = self.available
+        self.async_write_ha_state()
+
+    @callback
+    def _deferred_publish(self, _now) -> None:
+        self._cancel_deferred = None
+        self._handle_coordinator_update()
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Write state only for significant changes of the published keys."""
+        if not self._publish_keys or self.available != self._published_available:
+            self._publish()
+            return
+        wait = self._gate.evaluate(self._publish_values(), time.monotonic())
+        if wait is None:
+            return
+        if wait <= 0:
+            self._publish()
+        elif self._cancel_deferred is None:
+            self._cancel_deferred = async_call_later(self.hass, wait, self._deferred_publish)
@@ -0,0 +1,82 @@
+"""Offline command journal for the MSpa integration."""
+
+from __future__ import annotations
+
+import logging
+from collections.abc import Awaitable, Callable
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+
+from .capabilities import merge_desired_state
+from .const import DOMAIN
+from .mspaapi import MSPAAPIClosed, MSPAAPIConnectionError, MSPAAPIException
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+SAVE_DELAY = 1  # seconds
+
+
+class CommandJournal:
+    """Per-device desired state that has not reached the cloud yet.
+
+    Commands queued while the cloud is unreachable collapse into one
+    desired state per device and survive restarts.
+    """
+
+    def __init__(self, hass: HomeAssistant, entry_id: str):
+        """Initialize an empty journal for a config entry."""
+        self._store = Store(hass, STORAGE_VERSION, f"{DOMAIN}.command_journal.{entry_id}")
+        self.pending: dict[str, dict] = {}
+
+    async def async_load(self) -> None:
+        """Load pending commands saved before a restart."""
+        data = await self._store.async_load()
+        if data:
+            self.pending = data.get("pending", {})
+
+    def _data_to_save(self) -> dict:
+        return {"pending": self.pending}
+
+    def _save(self) -> None:
+        self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+
+    def record(self, device_id: str, desired_state: dict, capabilities: frozenset[str]) -> None:
+        """Queue a command, collapsing it into any pending one for the device."""
+        self.pending[device_id] = merge_desired_state(
+            self.pending.get(device_id, {}), desired_state, capabilities
+        )
+        self._save()
+
+    async def async_save(self) -> None:
+        """Write pending commands now rather than after the save delay."""
+        await self._store.async_save(self._data_to_save())
+
+    async def async_remove(self) -> None:
+        """Delete the journal's storage file."""
+        await self._store.async_remove()
+
+    def discard(self, device_id: str) -> None:
+        """Forget the pending command of a device."""
+        if self.pending.pop(device_id, None) is not None:
+            self._save()
+
+    async def async_flush(self, send: Callable[[str, dict], Awaitable[dict]]) -> None:
+        """Send one collapsed command per device; stop while still offline."""
+        for device_id, desired_state in list(self.pending.items()):
+            try:
+                await send(device_id, desired_state)
+            except MSPAAPIConnectionError as e:
+                _LOGGER.debug("MSpa still unreachable, keeping queued commands: %s", e)
+                return
+            except MSPAAPIClosed:
+                # Unloading; the entry's next setup sends them
+                raise
+            except MSPAAPIException as e:
+                _LOGGER.error("Dropping queued MSpa command for %s: %s", device_id, e)
+            else:
+                _LOGGER.info("Sent queued MSpa command for %s: %s", device_id, desired_state)
+            # A command queued while this one was in flight stays pending
+            if self.pending.get(device_id) is desired_state:
+                self.discard(device_id)
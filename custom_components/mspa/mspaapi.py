@@ -5,11 +5,59 @@ import hmac
 import time
 import secrets
 import string
-from aiohttp import ClientSession, ClientTimeout, ClientError
+from contextlib import contextmanager
+from contextvars import ContextVar
+from aiohttp import ClientSession, ClientTimeout, ClientError, TCPConnector
+
+from .endpoints import PROBE_TIMEOUT, EndpointSelector
+from .tracing import NULL_TRACER
+
+# Connector used when no session is supplied (e.g. outside Home Assistant)
+DNS_CACHE_TTL = 300  # seconds
+CONNECTION_LIMIT = 10
+KEEPALIVE_TIMEOUT = 60  # seconds
+
+# Per-endpoint request timeouts (seconds); other endpoints use the client's
+# timeout. Device listing returns the whole account, so it gets longer.
+ENDPOINT_TIMEOUTS = {
+    "enduser/devices/": 8,
+}
+
+# Monotonic deadline of the operation the current task belongs to
+_deadline = ContextVar("mspa_deadline", default=None)
 
 class MSPAAPI:
-    def __init__(self, base_url, api_key=None, device_id=None, product_id=None, headers=None, session=None, timeout=5, username=None, password=None, access_token=None):
-        self.base_url = base_url
+    """MSpa cloud API client.
+
+    Pass a shared session (Home Assistant's) to reuse its connections; the
+    caller then owns it. Without one, the client creates a session with a
+    tuned connector on first use and closes it in close() or on leaving
+    ``async with``.
+
+    ``endpoints`` is an optional list of {"base_url", "country"} candidates;
+    probe_endpoints() switches to the fastest and repeated transport
+    failures fail over to the next one.
+
+    ``recorder`` is an optional capture.TrafficRecorder that receives every
+    exchange; a capture.ReplayTransport passed as ``session`` plays one back.
+
+    Wrap an operation in ``with api.deadline(seconds):`` to give it one
+    budget: every nested request, including auto-login and the retry after a
+    token refresh, times out at the remaining budget and none starts once
+    it is spent.
+
+    close() cancels the requests still in flight; their callers get
+    MSPAAPIClosed at once instead of waiting for a stalled cloud to time out.
+
+    ``tracer`` is an optional tracing.Tracer; logins, calls (with their
+    attempt), signing, HTTP round trips and JSON decoding are then timed as
+    nested spans.
+    """
+
+    def __init__(self, base_url, api_key=None, device_id=None, product_id=None, headers=None, session=None, timeout=5, username=None, password=None, access_token=None, endpoints=None, country="US", recorder=None, tracer=None):
+        self._endpoints = EndpointSelector(endpoints or [{"base_url": base_url}])
+        self.base_url = self._endpoints.current.base_url
+        self.country = country  # Login region for endpoints that do not set one
         self.api_key = api_key
         self.device_id = device_id
         self.product_id = product_id
@@ -19,24 +67,96 @@ class MSPAAPI:
         self.password = password
         self._access_token = access_token  # Allow manual token input
         self._appid = "e1c8e068f9ca11eba4dc0242ac120002"  # Fixed app ID from const.py
+        self._login_lock = asyncio.Lock()  # One login at a time for concurrent callers
+
+        self._session = session
+        self._cleanup_session = session is None
+        self._closed = False
+        self._inflight = set()  # Exchange tasks close() cancels
+        self._recorder = recorder
+        self.tracer = tracer or NULL_TRACER
+
+    @property
+    def closed(self):
+        """Return True once close() has been called."""
+        return self._closed
+
+    @property
+    def access_token(self):
+        """Return the current access token, if logged in."""
+        return self._access_token
+
+    @staticmethod
+    @contextmanager
+    def deadline(budget):
+        """Bound every request made inside the block by one time budget.
+
+        Nested deadlines never extend an outer one.
+        """
+        deadline = time.monotonic() + budget
+        outer = _deadline.get()
+        if outer is not None:
+            deadline = min(deadline, outer)
+        token = _deadline.set(deadline)
+        try:
+            yield
+        finally:
+            _deadline.reset(token)
+
+    @staticmethod
+    def _remaining_budget():
+        """Return the seconds left on the current deadline, or None without one."""
+        deadline = _deadline.get()
+        return None if deadline is None else deadline - time.monotonic()
+
+    def _request_timeout(self, path):
+        """Return the timeout for a request, capped by the current deadline."""
+        timeout = ENDPOINT_TIMEOUTS.get(path, self._timeout)
+        remaining = self._remaining_budget()
+        if remaining is None:
+            return timeout
+        if remaining <= 0:
+            raise MSPAAPIDeadlineExceeded(f"Deadline exceeded before {path}")
+        return min(timeout, remaining)
+
+    async def __aenter__(self):
+        """Enter ``async with``; the client is closed on exit."""
+        return self
 
-        if session is None:
-            self._session = ClientSession()
-            self._cleanup_session = True
-        else:
-            self._session = session
-            self._cleanup_session = False
+    async def __aexit__(self, exc_type, exc, tb):
+        """Close the client on every exit path."""
+        await self.close()
+
+    def _get_session(self):
+        """Return the HTTP session, creating an owned one on first use."""
+        if self._closed or (self._session is not None and self._session.closed):
+            raise MSPAAPIClosed("Session already closed")
+        if self._session is None:
+            connector = TCPConnector(
+                ttl_dns_cache=DNS_CACHE_TTL,
+                limit=CONNECTION_LIMIT,
+                keepalive_timeout=KEEPALIVE_TIMEOUT,
+            )
+            trace_config = self.tracer.trace_config()
+            self._session = ClientSession(
+                connector=connector,
+                trace_configs=[trace_config] if trace_config is not None else None,
+            )
+        return self._session
 
     async def close(self):
-        """Explicitly closes the ClientSession."""
-        if not self._session.closed:
+        """Close the client; a shared session is left open for its owner."""
+        self._closed = True
+        for exchange in self._inflight:
+            exchange.cancel()
+        if self._recorder is not None:
+            self._recorder.close()
+        if self.tracer.enabled:
+            # Joins the trace file's writer thread
+            await asyncio.get_running_loop().run_in_executor(None, self.tracer.close)
+        if self._cleanup_session and self._session is not None and not self._session.closed:
             await self._session.close()
 
-    def __del__(self):
-        """Handles cleanup, but no longer closes the session here."""
-        if self._cleanup_session and not self._session.closed:
-            asyncio.create_task(self._session.close())  # Schedule the close operation
-
     def _generate_nonce(self, length=32):
         """Generate a random nonce string."""
         alphabet = string.ascii_letters + string.digits
@@ -119,25 +239,19 @@ class MSPAAPI:
             "registration_id": registration_id,
             "push_type": "android",
             "lan_code": "EN",
-            "country": "US"  # Default, could be made configurable
+            "country": self._endpoints.current.country or self.country
         }
         
         try:
-            url = f"{self.base_url.rstrip('/')}/enduser/get_token/"
-            # Build headers WITH signature but WITHOUT token for login
-            headers = self._build_login_headers(login_payload)
-            
-            resp = await self._session.post(
-                url,
-                headers=headers,
-                json=login_payload,
-                timeout=ClientTimeout(self._timeout),
-            )
-            
-            data = await resp.json()
+            with self.tracer.span("login", country=login_payload["country"]):
+                # Build headers WITH signature but WITHOUT token for login
+                with self.tracer.span("sign"):
+                    headers = self._build_login_headers(login_payload)
+
+                status, data = await self._request("POST", "enduser/get_token/", headers, login_payload)
             
             # Check for successful response
-            if data.get("code") == 0 or resp.status == 200:
+            if data.get("code") == 0 or status == 200:
                 # Extract token from response
                 token = data.get("data", {}).get("token") or data.get("token") or data.get("access_token")
                 if token:
@@ -148,81 +262,170 @@ class MSPAAPI:
                     
         except MSPAAPIException:
             raise  # Re-raise our custom exceptions
+        except (ClientError, asyncio.TimeoutError) as e:
+            raise MSPAAPIConnectionError(f"Login failed: {str(e) or type(e).__name__}") from e
         except Exception as e:
             raise MSPAAPIException(f"Login failed: {str(e)}")
         
         raise MSPAAPIException("Unable to authenticate with provided credentials")
 
-    async def refresh_token(self):
-        """Refresh the access token by logging in again."""
+    async def refresh_token(self, stale_token=None):
+        """Refresh the access token by logging in again.
+
+        Callers pass the token their failed request was sent with; when a
+        concurrent caller has already replaced it, no second login is made.
+        """
         if not self.username or not self.password:
             raise MSPAAPIException("Cannot refresh token without username and password")
-        
-        self._access_token = None  # Clear current token
-        await self.login()
+
+        async with self._login_lock:
+            if stale_token is not None and self._access_token not in (None, stale_token):
+                return
+            self._access_token = None  # Clear current token
+            await self.login()
+
+    async def _ensure_token(self):
+        """Log in once for concurrent callers if there is no token yet."""
+        if self.username and self.password and not self._access_token and not self.api_key:
+            async with self._login_lock:
+                if not self._access_token:
+                    await self.login()
 
     async def _call_with_retry(self, endpoint, payload=None, retry_auth=True):
         """Make API call with automatic token refresh on authentication failure."""
+        sent_token = None
         try:
-            return await self._call_internal(endpoint, payload)
+            with self.tracer.span("call", path=endpoint, attempt=1):
+                await self._ensure_token()
+                sent_token = self._access_token
+                return await self._call_internal(endpoint, payload)
+        except (MSPAAPIConnectionError, MSPAAPIClosed):
+            raise
         except MSPAAPIException as e:
             # If authentication fails and we have credentials, try refreshing token
             if retry_auth and self.username and self.password and ("auth" in str(e).lower() or "token" in str(e).lower()):
                 try:
-                    await self.refresh_token()
-                    return await self._call_internal(endpoint, payload)
+                    with self.tracer.span("call", path=endpoint, attempt=2):
+                        await self.refresh_token(sent_token)
+                        return await self._call_internal(endpoint, payload)
                 except MSPAAPIException:
                     # If refresh also fails, raise original error
                     raise e
             raise e
 
+    async def _request(self, method, path, headers, payload=None):
+        """Send one request to the current endpoint and decode its JSON body.
+
+        The exchange runs as its own task so close() can cancel it without
+        cancelling the caller.
+        """
+        exchange = asyncio.ensure_future(self._exchange(method, path, headers, payload))
+        self._inflight.add(exchange)
+        try:
+            return await exchange
+        except asyncio.CancelledError:
+            if self._closed and exchange.cancelled() and not asyncio.current_task().cancelling():
+                raise MSPAAPIClosed(f"Client closed during {path}") from None
+            raise
+        finally:
+            self._inflight.discard(exchange)
+
+    async def _exchange(self, method, path, headers, payload=None):
+        session = self._get_session()
+        url = f"{self.base_url.rstrip('/')}/{path}"
+        timeout = self._request_timeout(path)
+        capped = timeout < ENDPOINT_TIMEOUTS.get(path, self._timeout)
+        start = time.monotonic()
+        try:
+            with self.tracer.span("http", endpoint=self.base_url, method=method, path=path) as span:
+                resp = await session.request(
+                    method,
+                    url,
+                    headers=headers,
+                    json=payload,
+                    timeout=ClientTimeout(total=timeout),
+                )
+                span.set(status=resp.status)
+                with self.tracer.span("decode"):
+                    data = await resp.json()
+        except (ClientError, asyncio.TimeoutError) as exc:
+            if self._recorder is not None:
+                error = "TimeoutError" if isinstance(exc, asyncio.TimeoutError) else type(exc).__name__
+                self._recorder.record(method, path, payload, None, None, time.monotonic() - start, error=error)
+            # A timeout cut short by the operation's deadline says nothing
+            # about the endpoint, so it does not count towards its circuit
+            if not (capped and isinstance(exc, asyncio.TimeoutError)) and self._endpoints.record_failure():
+                self._use_current_endpoint()
+            raise
+        if self._recorder is not None:
+            self._recorder.record(method, path, payload, resp.status, data, time.monotonic() - start)
+        self._endpoints.record_success()
+        return resp.status, data
+
+    def _use_current_endpoint(self):
+        """Point requests at the selector's current endpoint."""
+        if self.base_url == self._endpoints.current.base_url:
+            return
+        self.base_url = self._endpoints.current.base_url
+        # Tokens are issued per region; log in again on the new endpoint
+        if self.username and self.password:
+            self._access_token = None
+
+    async def probe_endpoints(self):
+        """Probe the candidate endpoints and switch to the fastest healthy one.
+
+        The probe is bounded by the remaining deadline and skipped once it
+        is spent.
+        """
+        timeout = PROBE_TIMEOUT
+        remaining = self._remaining_budget()
+        if remaining is not None:
+            if remaining <= 0:
+                return self.base_url
+            timeout = min(timeout, remaining)
+        if await self._endpoints.probe(self._get_session(), timeout):
+            self._use_current_endpoint()
+        return self.base_url
+
     async def _call_internal(self, endpoint, payload=None):
         """Internal method for making API calls without retry logic."""
-        if self._session.closed:
-            raise MSPAAPIException("Session already closed")
-
         # Auto-login if we have username/password but no token
-        if self.username and self.password and not self._access_token and not self.api_key:
-            await self.login()
+        await self._ensure_token()
 
-        url = f"{self.base_url.rstrip('/')}/{endpoint}"
-        headers = self._build_headers(payload)
+        with self.tracer.span("sign"):
+            headers = self._build_headers(payload)
 
         try:
-            resp = await self._session.post(
-                url,
-                headers=headers,
-                json=payload,
-                timeout=ClientTimeout(self._timeout),
-            )
-            data = await resp.json()
+            _, data = await self._request("POST", endpoint, headers, payload)
             if data.get("code") != 0:  # Assuming 0 means success
                 self._handle_error(data)
             else:
                 return data  # Return the full response
         except ClientError as exc:
-            raise MSPAAPIException("Unable to communicate with MSpa API") from exc
+            raise MSPAAPIConnectionError("Unable to communicate with MSpa API") from exc
         except asyncio.TimeoutError as exc:
-            raise MSPAAPIException("MSpa API request timed out") from exc
+            raise MSPAAPIConnectionError("MSpa API request timed out") from exc
 
     async def _call(self, endpoint, payload=None):
         """Public API call method with automatic token refresh."""
         return await self._call_with_retry(endpoint, payload)
 
 
-    async def get_device_status(self):
+    async def get_device_status(self, device_id=None, product_id=None):
+        """Fetch the shadow of a device, defaulting to the client's own device."""
         payload = {
-            "device_id": self.device_id,
-            "product_id": self.product_id
+            "device_id": device_id or self.device_id,
+            "product_id": product_id or self.product_id
         }
         response = await self._call("device/thing_shadow", payload)
         return response.get("data")
     
-    async def send_device_command(self, desired_state):
+    async def send_device_command(self, desired_state, device_id=None, product_id=None):
+        """Send desired state to a device, defaulting to the client's own device."""
         payload = {
             "desired": json.dumps({"state": {"desired": desired_state}}),
-            "device_id": self.device_id,
-            "product_id": self.product_id
+            "device_id": device_id or self.device_id,
+            "product_id": product_id or self.product_id
         }
         return await self._call("device/command", payload)
 
@@ -232,21 +435,34 @@ class MSPAAPI:
 
     async def get_user_devices(self):
         """Get list of devices associated with the user account."""
+        sent_token = None
+        try:
+            with self.tracer.span("call", path="enduser/devices/", attempt=1):
+                await self._ensure_token()
+                sent_token = self._access_token
+                return await self._get_user_devices()
+        except (MSPAAPIConnectionError, MSPAAPIClosed):
+            raise
+        except MSPAAPIException as e:
+            # A stored token may have expired; log in again once
+            if self.username and self.password and ("auth" in str(e).lower() or "token" in str(e).lower()):
+                with self.tracer.span("call", path="enduser/devices/", attempt=2):
+                    await self.refresh_token(sent_token)
+                    return await self._get_user_devices()
+            raise
+
+    async def _get_user_devices(self):
         if not self._access_token:
-            raise MSPAAPIException("No access token available. Please login first.")
+            if not self.username or not self.password:
+                raise MSPAAPIException("No access token available. Please login first.")
+            await self.login()
         
         try:
             # Use GET request with token authentication and signature
-            url = f"{self.base_url.rstrip('/')}/enduser/devices/"
-            headers = self._build_headers()  # This will include token and signature
-            
-            resp = await self._session.get(
-                url,
-                headers=headers,
-                timeout=ClientTimeout(self._timeout),
-            )
+            with self.tracer.span("sign"):
+                headers = self._build_headers()  # This will include token and signature
             
-            data = await resp.json()
+            _, data = await self._request("GET", "enduser/devices/", headers)
             
             if data.get("code") != 0:
                 raise MSPAAPIException(f"Failed to get devices: {data.get('message', 'Unknown error')}")
@@ -271,6 +487,8 @@ class MSPAAPI:
             return device_list
         except MSPAAPIException:
             raise
+        except (ClientError, asyncio.TimeoutError) as e:
+            raise MSPAAPIConnectionError(f"Failed to get user devices: {str(e) or type(e).__name__}") from e
         except Exception as e:
             raise MSPAAPIException(f"Failed to get user devices: {str(e)}")
 
@@ -291,3 +509,12 @@ class MSPAAPIException(Exception):
 
     def __str__(self):
         return self.message
+
+class MSPAAPIConnectionError(MSPAAPIException):
+    """The MSpa cloud could not be reached (transport error or timeout)."""
+
+class MSPAAPIDeadlineExceeded(MSPAAPIConnectionError):
+    """The operation's time budget ran out before a request could start."""
+
+class MSPAAPIClosed(MSPAAPIException):
+    """The client was closed before or while the request was made."""
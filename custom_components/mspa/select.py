@@ -4,11 +4,11 @@ from typing import TYPE_CHECKING
 from homeassistant.components.select import SelectEntity
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
-from homeassistant.helpers.update_coordinator import CoordinatorEntity
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
-from .const import DOMAIN
-from .mspaapi import MSPAAPI, MSPAAPIException
+from .const import COMMAND_ACCEPTED, DOMAIN
+from .entity import MSpaEntity
+from .mspaapi import MSPAAPIException
 
 if TYPE_CHECKING:
     from . import MSPADataUpdateCoordinator
@@ -22,44 +22,39 @@ async def async_setup_entry(
     async_add_entities: AddEntitiesCallback,
 ) -> None:
     """Set up the MSpa select platform."""
-    # Get shared coordinator and API from hass.data
+    # Get shared coordinator from hass.data
     data = hass.data[DOMAIN][config_entry.entry_id]
     coordinator = data["coordinator"]
-    api = data["api"]
 
     async_add_entities([
-        MSpaBubbleLevelSelect(coordinator, api),
+        MSpaBubbleLevelSelect(coordinator, device)
+        for device in coordinator.devices.values()
+        if "bubble_level" in device["capabilities"]
     ])
 
 
-class MSpaBubbleLevelSelect(CoordinatorEntity, SelectEntity):
+class MSpaBubbleLevelSelect(MSpaEntity, SelectEntity):
     """Select entity for bubble level control."""
 
-    def __init__(self, coordinator: "MSPADataUpdateCoordinator", api: MSPAAPI):
+    def __init__(self, coordinator: "MSPADataUpdateCoordinator", device: dict):
         """Initialize the bubble level select."""
-        super().__init__(coordinator)
-        self._api = api
+        super().__init__(coordinator, device)
         self._attr_name = "Bubble Level"
-        self._attr_unique_id = f"mspa_{api.device_id}_bubble_level_select"
+        self._attr_unique_id = f"mspa_{self._device_id}_bubble_level_select"
         self._attr_icon = "mdi:chart-bubble"
         self._attr_options = ["Low", "Medium", "High"]
 
     @property
     def current_option(self) -> str | None:
         """Return the current selected option."""
-        if "bubble_level" in self.coordinator.data:
-            bubble_level = self.coordinator.data["bubble_level"]
+        if "bubble_level" in self.device_data:
+            bubble_level = self.device_data["bubble_level"]
             
             # Always show the last known bubble level regardless of bubble_state
             level_map = {1: "Low", 2: "Medium", 3: "High"}
             return level_map.get(bubble_level)
         return None
 
-    @property
-    def available(self) -> bool:
-        """Return True if entity is available."""
-        return bool(self.coordinator.data)
-
     async def async_select_option(self, option: str) -> None:
         """Change the selected option."""
         try:
@@ -78,15 +73,15 @@ class MSpaBubbleLevelSelect(CoordinatorEntity, SelectEntity):
             }
             
             # Optimistic update - update coordinator data immediately
-            if hasattr(self.coordinator, 'data') and self.coordinator.data:
-                self.coordinator.data["bubble_level"] = new_level
-                self.coordinator.data["bubble_state"] = 1
+            if self.device_data:
+                self.device_data["bubble_level"] = new_level
+                self.device_data["bubble_state"] = 1
                 self.coordinator.async_set_updated_data(self.coordinator.data)
             
-            response = await self._api.send_device_command(desired_state)
+            response = await self.coordinator.async_send_command(self._device_id, desired_state)
             _LOGGER.debug(f"MSpa bubble level select response: {response}")
 
-            if response.get("code") == 0 and response.get("message") == "SUCCESS":
+            if response.get("code") == 0 and response.get("message") in COMMAND_ACCEPTED:
                 _LOGGER.debug(f"Successfully changed bubble level to {option} and turned on bubbles.")
             else:
                 _LOGGER.warning(f"Unexpected MSpa bubble level response: {response}")
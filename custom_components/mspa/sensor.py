@@ -1,15 +1,14 @@
 import logging
 from typing import TYPE_CHECKING
 
-from homeassistant.components.sensor import SensorEntity
+from homeassistant.components.sensor import SensorDeviceClass, SensorEntity, SensorStateClass
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import UnitOfTemperature
-from homeassistant.util.unit_conversion import TemperatureConverter
-from homeassistant.core import HomeAssistant
-from homeassistant.helpers.update_coordinator import CoordinatorEntity
+from homeassistant.const import EntityCategory, UnitOfTemperature, UnitOfTime
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
 from .const import DOMAIN
+from .entity import MSpaEntity
 
 if TYPE_CHECKING:
     from . import MSPADataUpdateCoordinator
@@ -22,67 +21,93 @@ async def async_setup_entry(
     async_add_entities: AddEntitiesCallback,
 ) -> None:
     """Set up the MSpa sensor platform."""
-    # Get shared coordinator and API from hass.data
+    # Get shared coordinator from hass.data
     data = hass.data[DOMAIN][config_entry.entry_id]
     coordinator = data["coordinator"]
-    api = data["api"]
 
-    async_add_entities([
-        MSpANumericSensor(coordinator, "water_temperature", "Water Temperature"),
-        MSpANumericSensor(coordinator, "temperature_setting", "Target Temperature"),
-        MSpABubbleSensor(coordinator)
-    ])
+    sensors = []
+    for device in coordinator.devices.values():
+        capabilities = device["capabilities"]
+        sensors.extend(
+            MSpANumericSensor(coordinator, device, data_key, name)
+            for data_key, name in (
+                ("water_temperature", "Water Temperature"),
+                ("temperature_setting", "Target Temperature"),
+            )
+            if data_key in capabilities
+        )
+        if "bubble_level" in capabilities:
+            sensors.append(MSpABubbleSensor(coordinator, device))
+        if "water_temperature" in capabilities:
+            sensors.append(MSpAHeatingRateSensor(coordinator, device))
+            if "temperature_setting" in capabilities:
+                sensors.append(MSpATimeToTargetSensor(coordinator, device))
 
+    async_add_entities(sensors)
 
-class MSpANumericSensor(CoordinatorEntity, SensorEntity):
-    """Representation of a MSpa numeric sensor."""
+    # The freshness lag is only known for devices whose shadow carries report
+    # times, so its sensor is added once a report interval has been learned
+    without_cadence = set(coordinator.devices)
 
-    def __init__(self, coordinator: "MSPADataUpdateCoordinator", data_key: str, name: str):
+    @callback
+    def _add_freshness_sensors() -> None:
+        learned = [device_id for device_id in without_cadence if coordinator.cadence[device_id].interval is not None]
+        if learned:
+            without_cadence.difference_update(learned)
+            async_add_entities(MSpAFreshnessLagSensor(coordinator, coordinator.devices[device_id]) for device_id in learned)
+
+    _add_freshness_sensors()
+    config_entry.async_on_unload(coordinator.async_add_listener(_add_freshness_sensors))
+
+
+class MSpANumericSensor(MSpaEntity, SensorEntity):
+    """Representation of a MSpa numeric sensor.
+
+    Values are reported in °C; Home Assistant converts them to the system
+    unit and keeps long-term statistics.
+    """
+
+    _attr_device_class = SensorDeviceClass.TEMPERATURE
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_native_unit_of_measurement = UnitOfTemperature.CELSIUS
+
+    def __init__(self, coordinator: "MSPADataUpdateCoordinator", device: dict, data_key: str, name: str):
         """Initialize the MSpa numeric sensor."""
-        super().__init__(coordinator)
+        super().__init__(coordinator, device)
         self._data_key = data_key
+        self._publish_keys = (data_key,)
         self._attr_name = name
-        self._attr_unique_id = f"mspa_{coordinator._api.device_id}_{data_key}"
+        self._attr_unique_id = f"mspa_{self._device_id}_{data_key}"
         if data_key == "water_temperature":
             self._attr_icon = "mdi:thermometer-water"
         elif data_key == "temperature_setting":
             self._attr_icon = "mdi:thermostat"
 
     @property
-    def state(self):
+    def native_value(self) -> float | None:
         """Return the state of the sensor."""
-        if self._data_key in self.coordinator.data:
+        if self._data_key in self.device_data:
             # API returns doubled Celsius values, so divide by 2 to get actual Celsius
-            celsius_temp = self.coordinator.data[self._data_key] * 0.5
-            
-            # Convert to system unit preference
-            if self.hass.config.units.temperature_unit == UnitOfTemperature.FAHRENHEIT:
-                return TemperatureConverter.convert(celsius_temp, UnitOfTemperature.CELSIUS, UnitOfTemperature.FAHRENHEIT)
-            return celsius_temp
+            return self.device_data[self._data_key] * 0.5
         return None
 
-    @property
-    def unit_of_measurement(self):
-        """Return the unit of measurement of the sensor."""
-        return self.hass.config.units.temperature_unit
 
-
-class MSpABubbleSensor(CoordinatorEntity, SensorEntity):
+class MSpABubbleSensor(MSpaEntity, SensorEntity):
     """Representation of the MSpa bubble state sensor."""
 
-    def __init__(self, coordinator: "MSPADataUpdateCoordinator"):
+    def __init__(self, coordinator: "MSPADataUpdateCoordinator", device: dict):
         """Initialize the bubble sensor."""
-        super().__init__(coordinator)
+        super().__init__(coordinator, device)
         self._attr_name = "Bubble Level"
-        self._attr_unique_id = f"mspa_{coordinator._api.device_id}_bubble_level"
+        self._attr_unique_id = f"mspa_{self._device_id}_bubble_level"
         self._attr_icon = "mdi:chart-bubble"
 
     @property
     def state(self):
         """Return the current bubble level."""
-        if "bubble_level" in self.coordinator.data and "bubble_state" in self.coordinator.data:
-            bubble_state = self.coordinator.data["bubble_state"]
-            bubble_level = self.coordinator.data["bubble_level"]
+        if "bubble_level" in self.device_data and "bubble_state" in self.device_data:
+            bubble_state = self.device_data["bubble_state"]
+            bubble_level = self.device_data["bubble_level"]
             
             # If bubbles are off, show "Off" regardless of bubble_level
             if bubble_state == 0:
@@ -95,3 +120,95 @@ class MSpABubbleSensor(CoordinatorEntity, SensorEntity):
                 3: "High",
             }.get(bubble_level, "Unknown")
         return None
+
+
+class MSpAHeatingRateSensor(MSpaEntity, SensorEntity):
+    """Water temperature trend estimated from the coordinator's telemetry."""
+
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _publish_keys = ("heating_rate",)
+
+    def __init__(self, coordinator: "MSPADataUpdateCoordinator", device: dict):
+        """Initialize the heating rate sensor."""
+        super().__init__(coordinator, device)
+        self._attr_name = "Heating Rate"
+        self._attr_unique_id = f"mspa_{self._device_id}_heating_rate"
+        self._attr_icon = "mdi:thermometer-chevron-up"
+
+    def _publish_values(self) -> dict:
+        """Gate on the °C/h trend."""
+        return {"heating_rate": self.coordinator.telemetry[self._device_id].rate}
+
+    @property
+    def native_value(self) -> float | None:
+        """Return the trend of the current heater run per hour."""
+        rate = self.coordinator.telemetry[self._device_id].rate
+        if rate is None:
+            return None
+        # Temperature differences scale by 9/5 without the 32 offset
+        if self.hass.config.units.temperature_unit == UnitOfTemperature.FAHRENHEIT:
+            rate = rate * 9 / 5
+        return round(rate, 2)
+
+    @property
+    def native_unit_of_measurement(self) -> str:
+        """Return degrees per hour in the system unit."""
+        return f"{self.hass.config.units.temperature_unit}/h"
+
+
+class MSpATimeToTargetSensor(MSpaEntity, SensorEntity):
+    """Estimated time until the water reaches the target temperature."""
+
+    _attr_device_class = SensorDeviceClass.DURATION
+    _attr_native_unit_of_measurement = UnitOfTime.MINUTES
+    _publish_keys = ("time_to_target",)
+
+    def __init__(self, coordinator: "MSPADataUpdateCoordinator", device: dict):
+        """Initialize the time to target sensor."""
+        super().__init__(coordinator, device)
+        self._attr_name = "Time To Target"
+        self._attr_unique_id = f"mspa_{self._device_id}_time_to_target"
+        self._attr_icon = "mdi:timer-sand"
+
+    def _publish_values(self) -> dict:
+        """Gate on the minutes to target."""
+        return {"time_to_target": self.native_value}
+
+    @property
+    def native_value(self) -> int | None:
+        """Return minutes to target, or None when not heating towards it."""
+        if "temperature_setting" not in self.device_data:
+            return None
+        # API returns doubled Celsius values
+        target = self.device_data["temperature_setting"] * 0.5
+        hours = self.coordinator.telemetry[self._device_id].hours_to(target)
+        if hours is None:
+            return None
+        return round(hours * 60)
+
+
+class MSpAFreshnessLagSensor(MSpaEntity, SensorEntity):
+    """Diagnostic: how long after the device's shadow report it was polled."""
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_native_unit_of_measurement = UnitOfTime.SECONDS
+    _attr_state_class = SensorStateClass.MEASUREMENT
+
+    def __init__(self, coordinator: "MSPADataUpdateCoordinator", device: dict):
+        """Initialize the freshness lag sensor."""
+        super().__init__(coordinator, device)
+        self._attr_name = "Data Freshness Lag"
+        self._attr_unique_id = f"mspa_{self._device_id}_freshness_lag"
+        self._attr_icon = "mdi:timer-outline"
+
+    @property
+    def native_value(self) -> int | None:
+        """Return the lag between the last report and the poll that saw it."""
+        lag = self.coordinator.cadence[self._device_id].freshness_lag
+        return None if lag is None else round(lag)
+
+    @property
+    def extra_state_attributes(self) -> dict:
+        """Return the learned shadow report interval."""
+        interval = self.coordinator.cadence[self._device_id].interval
+        return {"report_interval": None if interval is None else round(interval)}
@@ -0,0 +1,139 @@
+"""Local stand-in for the MSpa cloud API, for soak tests and benchmarks."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import random
+import secrets
+
+from aiohttp import web
+
+DEFAULT_SHADOW = {
+    "heater_state": 0,
+    "filter_state": 1,
+    "bubble_state": 0,
+    "bubble_level": 1,
+    "ozone_state": 0,
+    "uvc_state": 0,
+    "safety_lock": 0,
+    "temperature_unit": 0,
+    # Doubled Celsius, as the real API reports them
+    "temperature_setting": 76,
+    "water_temperature": 60,
+}
+
+
+class StandInServer:
+    """Serve login, device listing, thing_shadow and command like the cloud.
+
+    ``latency`` (plus up to ``jitter``) delays every answer and a fraction
+    ``error_rate`` of shadow and command requests get an HTTP 500. Setting
+    ``hang`` makes shadow and command requests never answer, like a stalled
+    cloud, while login and listing keep working. Only tokens from its own
+    logins are accepted; others get the cloud's "token expired" answer.
+    """
+
+    def __init__(self, devices: int = 1, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0, hang: bool = False):
+        """Initialize the stand-in with the given number of fake spas."""
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.hang = hang
+        self.requests = 0
+        self.stalled = 0
+        self.logins = 0
+        self.tokens: set[str] = set()
+        self.devices = [
+            {
+                "device_id": f"standin{index:04d}",
+                "product_id": "standin",
+                "name": f"Stand-in {index}",
+                "product_model": "standin",
+                "is_online": True,
+                "is_connect": True,
+            }
+            for index in range(devices)
+        ]
+        self.shadows = {device["device_id"]: dict(DEFAULT_SHADOW) for device in self.devices}
+        self._runner: web.AppRunner | None = None
+        self._stalled = asyncio.Event()
+        self.url: str | None = None
+
+    async def _delay(self) -> None:
+        self.requests += 1
+        delay = self.latency + (random.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay:
+            await asyncio.sleep(delay)
+
+    def _authorized(self, request: web.Request) -> bool:
+        return request.headers.get("authorization", "").removeprefix("token ") in self.tokens
+
+    async def _device_request(self, request: web.Request) -> dict:
+        if not self._authorized(request):
+            return {"code": 11, "message": "token expired"}
+        if self.hang:
+            self.stalled += 1
+            # Never set; the request is only ended by the client giving up
+            await self._stalled.wait()
+        await self._delay()
+        if self.error_rate and random.random() < self.error_rate:
+            raise web.HTTPInternalServerError()
+        payload = await request.json()
+        if payload.get("device_id") not in self.shadows:
+            return {"code": 1, "message": "device not found"}
+        return payload
+
+    async def _probe(self, request: web.Request) -> web.Response:
+        await self._delay()
+        return web.json_response({"code": 0})
+
+    async def _login(self, request: web.Request) -> web.Response:
+        await self._delay()
+        self.logins += 1
+        token = secrets.token_hex(16)
+        self.tokens.add(token)
+        return web.json_response({"code": 0, "data": {"token": token}})
+
+    async def _list_devices(self, request: web.Request) -> web.Response:
+        await self._delay()
+        if not self._authorized(request):
+            return web.json_response({"code": 11, "message": "token expired"})
+        return web.json_response({"code": 0, "data": {"list": self.devices}})
+
+    async def _thing_shadow(self, request: web.Request) -> web.Response:
+        payload = await self._device_request(request)
+        if "code" in payload:
+            return web.json_response(payload)
+        return web.json_response({"code": 0, "data": self.shadows[payload["device_id"]]})
+
+    async def _command(self, request: web.Request) -> web.Response:
+        payload = await self._device_request(request)
+        if "code" in payload:
+            return web.json_response(payload)
+        desired = json.loads(payload["desired"])["state"]["desired"]
+        self.shadows[payload["device_id"]].update(desired)
+        return web.json_response({"code": 0, "message": "SUCCESS"})
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Start serving and return the base URL to pass to MSPAAPI."""
+        app = web.Application()
+        app.router.add_get("/api", self._probe)
+        app.router.add_post("/api/enduser/get_token/", self._login)
+        app.router.add_get("/api/enduser/devices/", self._list_devices)
+        app.router.add_post("/api/device/thing_shadow", self._thing_shadow)
+        app.router.add_post("/api/device/command", self._command)
+        # Do not wait for hanging requests on stop
+        self._runner = web.AppRunner(app, shutdown_timeout=0.1)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        bound_port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://{host}:{bound_port}/api"
+        return self.url
+
+    async def stop(self) -> None:
+        """Stop serving; requests left hanging are dropped."""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
@@ -7,11 +7,12 @@ import aiohttp
 from homeassistant.components.switch import SwitchEntity
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
-from homeassistant.helpers.update_coordinator import CoordinatorEntity
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
-from .const import DOMAIN, API_BASE_URL
-from .mspaapi import MSPAAPI, MSPAAPIException
+from .capabilities import FILTER_DEPENDENTS, filter_desired_state
+from .const import COMMAND_ACCEPTED, DOMAIN, API_BASE_URL
+from .entity import MSpaEntity
+from .mspaapi import MSPAAPIException
 
 if TYPE_CHECKING:
     from . import MSPADataUpdateCoordinator
@@ -27,24 +28,29 @@ async def async_setup_entry(
     async_add_entities: AddEntitiesCallback,
 ) -> None:
     """Set up the MSpa switch platform."""
-    # Get shared coordinator and API from hass.data
+    # Get shared coordinator from hass.data
     data = hass.data[DOMAIN][config_entry.entry_id]
     coordinator = data["coordinator"]
-    api = data["api"]
-
-    # Define the switches you want to create
-    switches = [
-        MSpASwitch(coordinator, api, "heater_state", "Heater"),
-        MSpASwitch(coordinator, api, "filter_state", "Filter"),
-        MSpASwitch(coordinator, api, "bubble_state", "Bubbles"),
-        MSpASwitch(coordinator, api, "ozone_state", "Ozone"),
-        MSpASwitch(coordinator, api, "uvc_state", "UVC"),
-        MSpASwitch(coordinator, api, "safety_lock", "Safety Lock"),
-        MSpaTemperatureUnitSwitch(coordinator, api),
-    ]
 
-    # Add entities to hass.data for easier access in async_turn_on and async_turn_off
-    hass.data.setdefault(DOMAIN, {}).setdefault("entities", []).extend(switches)
+    # Define the switches you want to create, skipping keys each model lacks
+    switch_types = [
+        ("heater_state", "Heater"),
+        ("filter_state", "Filter"),
+        ("bubble_state", "Bubbles"),
+        ("ozone_state", "Ozone"),
+        ("uvc_state", "UVC"),
+        ("safety_lock", "Safety Lock"),
+    ]
+    switches = []
+    for device in coordinator.devices.values():
+        capabilities = device["capabilities"]
+        switches.extend(
+            MSpASwitch(coordinator, device, data_key, name)
+            for data_key, name in switch_types
+            if data_key in capabilities
+        )
+        if "temperature_unit" in capabilities:
+            switches.append(MSpaTemperatureUnitSwitch(coordinator, device))
 
     async_add_entities(switches)
 
@@ -53,16 +59,15 @@ async def async_setup_entry(
 
 
 
-class MSpASwitch(CoordinatorEntity, SwitchEntity):
+class MSpASwitch(MSpaEntity, SwitchEntity):
     """Representation of a MSpa switch."""
 
-    def __init__(self, coordinator: "MSPADataUpdateCoordinator", api: MSPAAPI, data_key: str, name: str):
+    def __init__(self, coordinator: "MSPADataUpdateCoordinator", device: dict, data_key: str, name: str):
         """Initialize the MSpa switch."""
-        super().__init__(coordinator)
-        self._api = api
+        super().__init__(coordinator, device)
         self._data_key = data_key
         self._attr_name = name
-        self._attr_unique_id = f"mspa_{api.device_id}_{data_key}_switch"
+        self._attr_unique_id = f"mspa_{self._device_id}_{data_key}_switch"
         
         # Set descriptive icons based on switch type
         icon_map = {
@@ -78,12 +83,7 @@ class MSpASwitch(CoordinatorEntity, SwitchEntity):
     @property
     def is_on(self):
         """Return True if the switch is on."""
-        return self.coordinator.data.get(self._data_key, 0) == 1  # Check if value is 1
-
-    @property
-    def available(self) -> bool:
-        """Return True if entity is available."""
-        return bool(self.coordinator.data)
+        return self.device_data.get(self._data_key, 0) == 1  # Check if value is 1
 
     async def async_turn_on(self, **kwargs):
         """Turn the switch on."""
@@ -96,17 +96,17 @@ class MSpASwitch(CoordinatorEntity, SwitchEntity):
 
             # Set bubble_level when turning on bubbles - use current level, default to Medium if not set
             if self._data_key == "bubble_state":
-                bubble_level = self.coordinator.data.get("bubble_level", 2)  # Default to Medium if not set
+                bubble_level = self.device_data.get("bubble_level", 2)  # Default to Medium if not set
                 desired_state["bubble_level"] = bubble_level
 
-            response = await self._api.send_device_command(desired_state)
+            response = await self.coordinator.async_send_command(self._device_id, desired_state)
             _LOGGER.debug(f"MSpa command response: {response}")
 
-            if response.get("code") == 0 and response.get("message") == "SUCCESS":
+            if response.get("code") == 0 and response.get("message") in COMMAND_ACCEPTED:
                 # Optimistic update - immediately update coordinator data
-                if hasattr(self.coordinator, 'data') and self.coordinator.data:
+                if self.device_data:
                     for key, value in desired_state.items():
-                        self.coordinator.data[key] = value
+                        self.device_data[key] = value
                     self.coordinator.async_set_updated_data(self.coordinator.data)
                 _LOGGER.debug(f"Optimistically updated {self._data_key} to ON")
             else:
@@ -122,17 +122,17 @@ class MSpASwitch(CoordinatorEntity, SwitchEntity):
 
             # Check if turning off filter requires turning off heater, ozone, and uvc
             if self._data_key == "filter_state":
-                dependencies = ["heater_state", "ozone_state", "uvc_state"]
-                for dep in dependencies:
+                for dep in FILTER_DEPENDENTS:
                     desired_state[dep] = 0
+            desired_state = filter_desired_state(desired_state, self._capabilities)
 
-            response = await self._api.send_device_command(desired_state)
+            response = await self.coordinator.async_send_command(self._device_id, desired_state)
             _LOGGER.debug(f"MSpa command response: {response}")
-            if response.get("code") == 0 and response.get("message") == "SUCCESS":
+            if response.get("code") == 0 and response.get("message") in COMMAND_ACCEPTED:
                 # Optimistic update - immediately update coordinator data
-                if hasattr(self.coordinator, 'data') and self.coordinator.data:
+                if self.device_data:
                     for key, value in desired_state.items():
-                        self.coordinator.data[key] = value
+                        self.device_data[key] = value
                     self.coordinator.async_set_updated_data(self.coordinator.data)
                 _LOGGER.debug(f"Optimistically updated {self._data_key} to OFF")
             else:
@@ -141,45 +141,39 @@ class MSpASwitch(CoordinatorEntity, SwitchEntity):
             _LOGGER.error("Error turning off MSpa switch: %s", e)
 
 
-class MSpaTemperatureUnitSwitch(CoordinatorEntity, SwitchEntity):
+class MSpaTemperatureUnitSwitch(MSpaEntity, SwitchEntity):
     """Switch to toggle between Celsius and Fahrenheit."""
 
-    def __init__(self, coordinator: "MSPADataUpdateCoordinator", api: MSPAAPI):
+    def __init__(self, coordinator: "MSPADataUpdateCoordinator", device: dict):
         """Initialize the temperature unit switch."""
-        super().__init__(coordinator)
-        self._api = api
+        super().__init__(coordinator, device)
         self._attr_name = "Temperature Unit (°F)"
-        self._attr_unique_id = f"mspa_{api.device_id}_temperature_unit"
+        self._attr_unique_id = f"mspa_{self._device_id}_temperature_unit"
         # Dynamic icon will be set in the icon property
 
     @property
     def is_on(self):
         """Return True if set to Fahrenheit (1), False if Celsius (0)."""
-        return self.coordinator.data.get("temperature_unit", 0) == 1
+        return self.device_data.get("temperature_unit", 0) == 1
 
     @property
     def icon(self):
         """Return dynamic icon based on current temperature unit."""
-        if self.coordinator.data.get("temperature_unit", 0) == 1:
+        if self.device_data.get("temperature_unit", 0) == 1:
             return "mdi:temperature-fahrenheit"
         return "mdi:temperature-celsius"
 
-    @property
-    def available(self) -> bool:
-        """Return True if entity is available."""
-        return bool(self.coordinator.data)
-
     async def async_turn_on(self, **kwargs):
         """Set temperature unit to Fahrenheit."""
         try:
             desired_state = {"temperature_unit": 1}
-            response = await self._api.send_device_command(desired_state)
+            response = await self.coordinator.async_send_command(self._device_id, desired_state)
             _LOGGER.debug(f"MSpa temperature unit command response: {response}")
 
-            if response.get("code") == 0 and response.get("message") == "SUCCESS":
+            if response.get("code") == 0 and response.get("message") in COMMAND_ACCEPTED:
                 # Optimistic update - immediately update coordinator data
-                if hasattr(self.coordinator, 'data') and self.coordinator.data:
-                    self.coordinator.data["temperature_unit"] = 1
+                if self.device_data:
+                    self.device_data["temperature_unit"] = 1
                     self.coordinator.async_set_updated_data(self.coordinator.data)
                 _LOGGER.debug("Optimistically set temperature unit to Fahrenheit.")
             else:
@@ -192,13 +186,13 @@ class MSpaTemperatureUnitSwitch(CoordinatorEntity, SwitchEntity):
         """Set temperature unit to Celsius."""
         try:
             desired_state = {"temperature_unit": 0}
-            response = await self._api.send_device_command(desired_state)
+            response = await self.coordinator.async_send_command(self._device_id, desired_state)
             _LOGGER.debug(f"MSpa temperature unit command response: {response}")
 
-            if response.get("code") == 0 and response.get("message") == "SUCCESS":
+            if response.get("code") == 0 and response.get("message") in COMMAND_ACCEPTED:
                 # Optimistic update - immediately update coordinator data
-                if hasattr(self.coordinator, 'data') and self.coordinator.data:
-                    self.coordinator.data["temperature_unit"] = 0
+                if self.device_data:
+                    self.device_data["temperature_unit"] = 0
                     self.coordinator.async_set_updated_data(self.coordinator.data)
                 _LOGGER.debug("Optimistically set temperature unit to Celsius.")
             else:
@@ -0,0 +1,238 @@
+"""Rolling telemetry and heating-rate estimation for the MSpa integration."""
+
+from __future__ import annotations
+
+import math
+from array import array
+
+# Samples kept per device; memory stays constant however long HA runs
+DEFAULT_CAPACITY = 64
+
+SECONDS_PER_HOUR = 3600.0
+
+# thing_shadow fields that may carry the time of the device's last report.
+# Without one the report cadence is not learned and polls are not aligned.
+REPORT_TIME_KEYS = ("timestamp", "ts", "update_time", "updated_at")
+
+# Weight of a new gap in the smoothed report interval
+CADENCE_SMOOTHING = 0.3
+
+
+class HeatingRateEstimator:
+    """Fixed-size ring buffer of (timestamp, water °C, heater_state) samples.
+
+    A least-squares line is kept over the trailing run of samples that share
+    the latest heater_state. The regression sums are updated incrementally
+    as samples are added and evicted, so both add() and rate are O(1).
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        """Initialize an empty buffer."""
+        if capacity < 2:
+            raise ValueError("capacity must be at least 2")
+        self._capacity = capacity
+        self._times = array("d", [0.0]) * capacity
+        self._temps = array("d", [0.0]) * capacity
+        self._heater = array("b", [0]) * capacity
+        self._start = 0
+        self._count = 0
+        # Regression state for the current heater run; x is hours since _t0
+        self._run = 0
+        self._t0 = 0.0
+        self._sx = self._sy = self._sxx = self._sxy = 0.0
+
+    def __len__(self) -> int:
+        """Return the number of buffered samples."""
+        return self._count
+
+    def _index(self, offset: int) -> int:
+        return (self._start + offset) % self._capacity
+
+    def _accumulate(self, timestamp: float, temperature: float, sign: float) -> None:
+        x = (timestamp - self._t0) / SECONDS_PER_HOUR
+        self._sx += sign * x
+        self._sy += sign * temperature
+        self._sxx += sign * x * x
+        self._sxy += sign * x * temperature
+
+    def _reset_run(self, timestamp: float) -> None:
+        self._run = 0
+        self._t0 = timestamp
+        self._sx = self._sy = self._sxx = self._sxy = 0.0
+
+    def add(self, timestamp: float, temperature: float, heater_state: int) -> None:
+        """Add a sample; out-of-order or duplicate timestamps are ignored."""
+        heater_state = 1 if heater_state else 0
+        if self._count:
+            last = self._index(self._count - 1)
+            if timestamp <= self._times[last]:
+                return
+            if heater_state != self._heater[last]:
+                self._reset_run(timestamp)
+        else:
+            self._reset_run(timestamp)
+
+        if self._count == self._capacity:
+            # Evict the oldest sample, removing it from the run if it belongs to it
+            oldest = self._start
+            if self._run == self._count:
+                self._accumulate(self._times[oldest], self._temps[oldest], -1.0)
+                self._run -= 1
+            self._start = self._index(1)
+            self._count -= 1
+
+        slot = self._index(self._count)
+        self._times[slot] = timestamp
+        self._temps[slot] = temperature
+        self._heater[slot] = heater_state
+        self._count += 1
+        self._accumulate(timestamp, temperature, 1.0)
+        self._run += 1
+
+    @property
+    def latest(self) -> tuple[float, float, int] | None:
+        """Return the most recent (timestamp, temperature, heater_state)."""
+        if not self._count:
+            return None
+        last = self._index(self._count - 1)
+        return self._times[last], self._temps[last], self._heater[last]
+
+    @property
+    def heating(self) -> bool:
+        """Return True if the latest sample had the heater on."""
+        latest = self.latest
+        return bool(latest and latest[2])
+
+    @property
+    def rate(self) -> float | None:
+        """Return the temperature trend of the current heater run in °C/hour."""
+        n = self._run
+        if n < 2:
+            return None
+        denominator = n * self._sxx - self._sx * self._sx
+        if denominator <= 1e-12:
+            return None
+        return (n * self._sxy - self._sx * self._sy) / denominator
+
+    def hours_to(self, target: float) -> float | None:
+        """Return the hours until the water reaches target while heating.
+
+        None when the heater is off, the trend is not rising or the target
+        is already reached.
+        """
+        latest = self.latest
+        rate = self.rate
+        if latest is None or rate is None or not latest[2] or rate <= 0:
+            return None
+        remaining = target - latest[1]
+        if remaining <= 0:
+            return None
+        return remaining / rate
+
+
+def _report_time(shadow: dict) -> float | None:
+    """Return the report time in epoch seconds if the shadow carries one."""
+    for key in REPORT_TIME_KEYS:
+        value = shadow.get(key)
+        if isinstance(value, (int, float)) and value > 0:
+            # Millisecond timestamps
+            return value / 1000 if value > 1e11 else float(value)
+    return None
+
+
+class ShadowCadenceTracker:
+    """Learn how often the cloud shadow is updated by the device.
+
+    Only report times carried by the shadow itself are used. Guessing them
+    from value changes between polls would learn the poll schedule rather
+    than the device's, so without that metadata nothing is learned.
+    Polls that miss reports see gaps spanning several of them; those are
+    folded onto the current estimate.
+    """
+
+    def __init__(self):
+        """Initialize with no cadence learned."""
+        self.interval: float | None = None
+        self.last_report: float | None = None
+        self.freshness_lag: float | None = None
+
+    def observe(self, polled_at: float, shadow: dict) -> None:
+        """Record a poll of the shadow made at polled_at (epoch seconds)."""
+        if not shadow:
+            return
+        report_time = _report_time(shadow)
+        if report_time is None or (self.last_report is not None and report_time <= self.last_report):
+            return
+        if self.last_report is not None:
+            gap = report_time - self.last_report
+            if self.interval is not None and gap > 1.5 * self.interval:
+                gap /= round(gap / self.interval)
+            if self.interval is None:
+                self.interval = gap
+            else:
+                self.interval += CADENCE_SMOOTHING * (gap - self.interval)
+        self.last_report = report_time
+        self.freshness_lag = max(0.0, polled_at - report_time)
+
+    def next_report(self, after: float) -> float | None:
+        """Return the first expected report time at or after the given time."""
+        if self.interval is None or self.last_report is None:
+            return None
+        periods = max(0, math.ceil((after - self.last_report) / self.interval))
+        return self.last_report + periods * self.interval
+
+
+class PublishPolicy:
+    """When a new value of a key is significant enough to publish.
+
+    A change smaller than deadband is ignored, a significant change is held
+    back until min_interval has passed since the last publish, and the
+    current value is published anyway once heartbeat seconds have passed.
+    """
+
+    def __init__(self, deadband: float = 0.0, min_interval: float = 0.0, heartbeat: float | None = None):
+        """Initialize the policy; the defaults publish every change at once."""
+        self.deadband = deadband
+        self.min_interval = min_interval
+        self.heartbeat = heartbeat
+
+
+EXACT_POLICY = PublishPolicy()
+
+
+class PublishGate:
+    """Decimate the values an entity publishes according to per-key policies."""
+
+    def __init__(self, policies: dict[str, PublishPolicy]):
+        """Initialize with policies for the keys that need one."""
+        self._policies = policies
+        self._published: dict | None = None
+        self._published_at = 0.0
+
+    def _significant(self, key: str, value, policy: PublishPolicy) -> bool:
+        previous = self._published.get(key)
+        if value == previous:
+            return False
+        if isinstance(value, (int, float)) and isinstance(previous, (int, float)):
+            return abs(value - previous) >= policy.deadband
+        return True
+
+    def evaluate(self, values: dict, now: float) -> float | None:
+        """Return 0 to publish now, seconds to wait, or None to skip."""
+        if self._published is None or values.keys() != self._published.keys():
+            return 0.0
+        elapsed = now - self._published_at
+        wait = None
+        for key, value in values.items():
+            policy = self._policies.get(key, EXACT_POLICY)
+            if self._significant(key, value, policy):
+                remaining = max(0.0, policy.min_interval - elapsed)
+                wait = remaining if wait is None else min(wait, remaining)
+            elif policy.heartbeat is not None and elapsed >= policy.heartbeat:
+                wait = 0.0
+        return wait
+
+    def published(self, values: dict, now: float) -> None:
+        """Record the values that were just published."""
+        self._published = dict(values)
+        self._published_at = now
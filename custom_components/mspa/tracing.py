@@ -0,0 +1,212 @@
+"""Opt-in timing spans for the MSpa API client and coordinator."""
+
+from __future__ import annotations
+
+import json
+import logging
+import secrets
+import time
+from collections import deque
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from queue import SimpleQueue
+
+from aiohttp import TraceConfig
+
+# Finished spans kept in memory for the diagnostics dump
+DEFAULT_BUFFER_SIZE = 500
+# Rotation of the optional trace file
+TRACE_FILE_MAX_BYTES = 1_000_000
+TRACE_FILE_BACKUPS = 2
+
+_current_span: ContextVar["Span | None"] = ContextVar("mspa_span", default=None)
+
+
+class Span:
+    """One timed operation, nested under the span that was open when it started."""
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start", "duration", "attributes", "error", "_started", "_token")
+
+    def __init__(self, name: str, parent: "Span | None", attributes: dict):
+        """Start the span."""
+        self.name = name
+        self.trace_id = parent.trace_id if parent is not None else secrets.token_hex(8)
+        self.span_id = secrets.token_hex(4)
+        self.parent_id = parent.span_id if parent is not None else None
+        self.start = time.time()
+        self.duration: float | None = None
+        self.attributes = attributes
+        self.error: str | None = None
+        self._started = time.perf_counter()
+        self._token = None
+
+    def set(self, **attributes) -> None:
+        """Add attributes to the span."""
+        self.attributes.update(attributes)
+
+    def as_dict(self) -> dict:
+        """Return the span as a JSON-serializable dict."""
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start": round(self.start, 6),
+            "duration": None if self.duration is None else round(self.duration, 6),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class _SpanScope:
+    """Context manager that opens a span on enter and exports it on exit."""
+
+    __slots__ = ("_tracer", "_name", "_attributes", "_span")
+
+    def __init__(self, tracer: "Tracer", name: str, attributes: dict):
+        self._tracer = tracer
+        self._name = name
+        self._attributes = attributes
+        self._span = None
+
+    def __enter__(self) -> Span:
+        span = Span(self._name, _current_span.get(), self._attributes)
+        span._token = _current_span.set(span)
+        self._span = span
+        return span
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        span = self._span
+        span.duration = time.perf_counter() - span._started
+        if exc_type is not None:
+            span.error = exc_type.__name__
+        _current_span.reset(span._token)
+        self._tracer._export(span)
+        return False
+
+
+class _NullSpan:
+    """Span and scope in one that records nothing."""
+
+    __slots__ = ()
+
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        return False
+
+    def set(self, **attributes) -> None:
+        """Ignore the attributes."""
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class NullTracer:
+    """Tracer used while tracing is off; every span is the same no-op."""
+
+    enabled = False
+
+    def span(self, name: str, **attributes) -> _NullSpan:
+        """Return the shared no-op span."""
+        return _NULL_SPAN
+
+    def current(self) -> _NullSpan:
+        """Return the shared no-op span."""
+        return _NULL_SPAN
+
+    def spans(self) -> list[dict]:
+        """Return no spans."""
+        return []
+
+    def trace_config(self) -> None:
+        """Return no aiohttp trace config."""
+        return None
+
+    def close(self) -> None:
+        """Nothing to close."""
+
+
+NULL_TRACER = NullTracer()
+
+
+class Tracer:
+    """Record nested spans to a ring buffer and optionally a rotating file.
+
+    Use ``with tracer.span("name", key=value) as span:``; spans opened inside
+    become its children, across awaits, within the same task. The file is
+    opened here, so create a tracer with a path outside the event loop.
+    Spans only reach the file through a queue; a listener thread writes
+    and rotates it, and close() joins that thread, so it blocks too.
+    """
+
+    enabled = True
+
+    def __init__(self, buffer_size: int = DEFAULT_BUFFER_SIZE, path: str | None = None):
+        """Initialize the buffer and, when path is given, the trace file."""
+        self._buffer: deque[Span] = deque(maxlen=buffer_size)
+        self.path = path
+        self._handler = None
+        self._listener = None
+        if path is not None:
+            file_handler = RotatingFileHandler(
+                path,
+                maxBytes=TRACE_FILE_MAX_BYTES,
+                backupCount=TRACE_FILE_BACKUPS,
+                encoding="utf-8",
+            )
+            file_handler.setFormatter(logging.Formatter("%(message)s"))
+            queue = SimpleQueue()
+            self._handler = QueueHandler(queue)
+            self._listener = QueueListener(queue, file_handler)
+            self._listener.start()
+
+    def span(self, name: str, **attributes) -> _SpanScope:
+        """Return a context manager timing one operation."""
+        return _SpanScope(self, name, attributes)
+
+    def current(self) -> Span | _NullSpan:
+        """Return the innermost open span, or a no-op span outside any."""
+        return _current_span.get() or _NULL_SPAN
+
+    def _export(self, span: Span) -> None:
+        self._buffer.append(span)
+        if self._handler is not None:
+            line = json.dumps(span.as_dict(), separators=(",", ":"), default=str)
+            self._handler.emit(logging.makeLogRecord({"msg": line}))
+
+    def spans(self) -> list[dict]:
+        """Return the buffered spans, oldest first."""
+        return [span.as_dict() for span in self._buffer]
+
+    def trace_config(self) -> TraceConfig:
+        """Return an aiohttp TraceConfig that adds connection setup to the open span.
+
+        Only sessions created with it report connection timings; Home
+        Assistant's shared session has none, so tracing uses its own session.
+        """
+        trace_config = TraceConfig()
+
+        async def on_connection_create_start(session, context, params):
+            context.connect_started = time.perf_counter()
+
+        async def on_connection_create_end(session, context, params):
+            self.current().set(connect=round(time.perf_counter() - context.connect_started, 6), reused=False)
+
+        async def on_connection_reuseconn(session, context, params):
+            self.current().set(reused=True)
+
+        trace_config.on_connection_create_start.append(on_connection_create_start)
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+        return trace_config
+
+    def close(self) -> None:
+        """Write the queued spans and close the trace file; blocks."""
+        if self._listener is not None:
+            self._handler = None
+            self._listener.stop()
+            for handler in self._listener.handlers:
+                handler.close()
+            self._listener = None
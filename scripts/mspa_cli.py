@@ -0,0 +1,28 @@
+"""Run the MSpa command line client without Home Assistant installed.
+
+    python scripts/mspa_cli.py devices
+    python scripts/mspa_cli.py soak --standin --clients 50
+
+The client only uses the API modules, but ``python -m custom_components.mspa``
+imports the package __init__, which needs Home Assistant. This registers the
+package without running its __init__ and then starts the same client.
+"""
+
+import sys
+import types
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+try:
+    import homeassistant  # noqa: F401
+except ImportError:
+    _package = types.ModuleType("custom_components.mspa")
+    _package.__path__ = [str(ROOT / "custom_components" / "mspa")]
+    sys.modules["custom_components.mspa"] = _package
+
+from custom_components.mspa.__main__ import main  # noqa: E402
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,15 @@
+"""Shared test setup for the MSpa integration."""
+
+import sys
+import types
+from pathlib import Path
+
+try:
+    import homeassistant  # noqa: F401
+except ImportError:
+    # The pure-logic modules (telemetry, capabilities, endpoints, mspaapi...)
+    # do not use Home Assistant, but the package __init__ does. Register the
+    # package without running it so they can be tested on their own.
+    _package = types.ModuleType("custom_components.mspa")
+    _package.__path__ = [str(Path(__file__).parent.parent / "custom_components" / "mspa")]
+    sys.modules["custom_components.mspa"] = _package
@@ -0,0 +1,48 @@
+"""Tests for capability detection and command merging."""
+
+from custom_components.mspa.capabilities import filter_desired_state, get_capabilities, learn_capabilities, merge_desired_state
+from custom_components.mspa.const import ALL_CAPABILITIES
+
+BASIC = ALL_CAPABILITIES - {"ozone_state", "uvc_state"}
+
+
+def test_capabilities_follow_the_reported_shadow():
+    shadow = {key: 0 for key in BASIC} | {"some_other_field": 1}
+    assert get_capabilities(shadow) == BASIC
+
+
+def test_empty_shadow_falls_back_to_everything():
+    assert get_capabilities(None) == ALL_CAPABILITIES
+    assert get_capabilities({}) == ALL_CAPABILITIES
+    assert get_capabilities({"unrelated": 1}) == ALL_CAPABILITIES
+
+
+def test_empty_shadow_teaches_nothing():
+    assert learn_capabilities(None) is None
+    assert learn_capabilities({}) is None
+    assert learn_capabilities({"unrelated": 1}) is None
+    assert learn_capabilities({key: 0 for key in BASIC}) == BASIC
+
+
+def test_filter_drops_unsupported_keys():
+    assert filter_desired_state({"heater_state": 1, "ozone_state": 1}, BASIC) == {"heater_state": 1}
+
+
+def test_newer_command_wins_per_key():
+    merged = merge_desired_state({"heater_state": 1, "bubble_level": 2}, {"bubble_level": 3}, ALL_CAPABILITIES)
+    assert merged == {"heater_state": 1, "bubble_level": 3}
+
+
+def test_filter_off_forces_its_dependents_off():
+    merged = merge_desired_state({"heater_state": 1, "filter_state": 1}, {"filter_state": 0}, ALL_CAPABILITIES)
+    assert merged == {"heater_state": 0, "filter_state": 0, "ozone_state": 0, "uvc_state": 0}
+
+
+def test_dependents_on_force_the_filter_on():
+    merged = merge_desired_state({"filter_state": 0, "ozone_state": 0}, {"heater_state": 1}, ALL_CAPABILITIES)
+    assert merged == {"filter_state": 1, "ozone_state": 0, "heater_state": 1}
+
+
+def test_merge_respects_capabilities():
+    merged = merge_desired_state({"temperature_setting": 76}, {"filter_state": 0}, BASIC)
+    assert merged == {"temperature_setting": 76, "filter_state": 0, "heater_state": 0}
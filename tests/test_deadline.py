@@ -0,0 +1,76 @@
+"""Tests for deadline propagation through the API client."""
+
+import asyncio
+import time
+
+import pytest
+
+from custom_components.mspa.endpoints import EndpointSelector
+from custom_components.mspa.mspaapi import MSPAAPI, MSPAAPIConnectionError, MSPAAPIDeadlineExceeded
+from custom_components.mspa.standin import StandInServer
+
+
+def run_against_standin(scenario, **standin):
+    async def main():
+        server = StandInServer(**standin)
+        url = await server.start()
+        try:
+            async with MSPAAPI(url, username="user", password="secret") as api:
+                return await scenario(api, server)
+        finally:
+            await server.stop()
+
+    return asyncio.run(main())
+
+
+def test_nested_deadline_never_extends_the_outer_one():
+    api = MSPAAPI("http://127.0.0.1:1/api")
+    with api.deadline(0.5):
+        with api.deadline(30):
+            assert api._request_timeout("device/thing_shadow") <= 0.5
+        with api.deadline(0.1):
+            assert api._request_timeout("device/thing_shadow") <= 0.1
+    assert api._request_timeout("device/thing_shadow") == 5
+
+
+def test_spent_deadline_fails_before_sending():
+    async def scenario(api, server):
+        with api.deadline(0.05):
+            await asyncio.sleep(0.06)
+            with pytest.raises(MSPAAPIDeadlineExceeded):
+                await api.get_device_status("standin0000", "standin")
+        return server.requests
+
+    assert run_against_standin(scenario) == 0
+
+
+def test_login_and_call_share_one_budget():
+    async def scenario(api, server):
+        start = time.monotonic()
+        # Login and thing_shadow take 0.3 s each; the budget only covers one
+        with pytest.raises(MSPAAPIConnectionError), api.deadline(0.45):
+            await api.get_device_status("standin0000", "standin")
+        return time.monotonic() - start
+
+    assert run_against_standin(scenario, latency=0.3) < 0.6
+
+
+def test_connection_errors_do_not_log_in_again():
+    async def scenario(api, server):
+        with pytest.raises(MSPAAPIConnectionError):
+            await api.get_device_status("standin0000", "standin")
+        return server.requests
+
+    # One login and one failed thing_shadow, no re-login and retry
+    assert run_against_standin(scenario, error_rate=1.0) == 2
+
+
+def test_probe_is_bounded_by_the_remaining_budget():
+    async def scenario(api, server):
+        api._endpoints = EndpointSelector([{"base_url": server.url}, {"base_url": server.url + "/"}])
+        start = time.monotonic()
+        with api.deadline(0.2):
+            await api.probe_endpoints()
+        return time.monotonic() - start
+
+    assert run_against_standin(scenario, latency=2) < 1
@@ -0,0 +1,157 @@
+"""Tests for endpoint probing and failover against local stand-ins."""
+
+import asyncio
+
+import pytest
+from aiohttp import ClientSession
+
+from custom_components.mspa.endpoints import EndpointSelector
+from custom_components.mspa.mspaapi import MSPAAPI, MSPAAPIConnectionError
+from custom_components.mspa.standin import StandInServer
+
+
+async def start_standins(*servers):
+    return [await server.start() for server in servers]
+
+
+def test_probe_picks_the_fastest_endpoint():
+    async def scenario():
+        servers = [StandInServer(latency=0.3), StandInServer(latency=0.01), StandInServer(latency=0.15)]
+        urls = await start_standins(*servers)
+        try:
+            selector = EndpointSelector([{"base_url": url} for url in urls])
+            async with ClientSession() as session:
+                assert await selector.probe(session)
+            assert selector.current.base_url == urls[1]
+            latencies = [endpoint.latency for endpoint in selector.endpoints]
+            assert latencies[1] < latencies[2] < latencies[0]
+        finally:
+            for server in servers:
+                await server.stop()
+
+    asyncio.run(scenario())
+
+
+def test_probe_ignores_unreachable_endpoints():
+    async def scenario():
+        slow, gone = StandInServer(latency=0.05), StandInServer()
+        slow_url, gone_url = await start_standins(slow, gone)
+        await gone.stop()
+        try:
+            selector = EndpointSelector([{"base_url": gone_url}, {"base_url": slow_url}])
+            async with ClientSession() as session:
+                assert await selector.probe(session, timeout=1)
+            assert selector.endpoints[0].latency is None
+            assert selector.current.base_url == slow_url
+        finally:
+            await slow.stop()
+
+    asyncio.run(scenario())
+
+
+def test_failover_opens_the_circuit():
+    async def scenario():
+        servers = [StandInServer(latency=0.01), StandInServer(latency=0.1), StandInServer(latency=0.05)]
+        urls = await start_standins(*servers)
+        try:
+            selector = EndpointSelector([{"base_url": url} for url in urls], failure_threshold=3)
+            async with ClientSession() as session:
+                await selector.probe(session)
+                assert selector.current.base_url == urls[0]
+                assert not selector.record_failure()
+                assert not selector.record_failure()
+                # Third consecutive failure: fail over to the next fastest
+                assert selector.record_failure()
+                assert selector.current.base_url == urls[2]
+                # The open circuit keeps the fastest endpoint out of a re-probe
+                await selector.probe(session)
+                assert selector.current.base_url == urls[2]
+        finally:
+            for server in servers:
+                await server.stop()
+
+    asyncio.run(scenario())
+
+
+def test_success_resets_the_failure_count():
+    selector = EndpointSelector([{"base_url": "http://a"}, {"base_url": "http://b"}], failure_threshold=2)
+    selector.record_failure()
+    selector.record_success()
+    assert not selector.record_failure()
+    assert selector.current.base_url == "http://a"
+
+
+def test_client_fails_over_on_server_errors():
+    async def scenario():
+        broken, healthy = StandInServer(error_rate=1.0), StandInServer()
+        broken_url, healthy_url = await start_standins(broken, healthy)
+        device = broken.devices[0]
+        try:
+            async with MSPAAPI(
+                broken_url,
+                username="user",
+                password="secret",
+                endpoints=[{"base_url": broken_url}, {"base_url": healthy_url}],
+            ) as api:
+                for _ in range(3):
+                    with pytest.raises(MSPAAPIConnectionError):
+                        await api.get_device_status(device["device_id"], device["product_id"])
+                assert api.base_url == healthy_url
+                # Logs in again on the new endpoint and succeeds
+                shadow = await api.get_device_status(device["device_id"], device["product_id"])
+                assert "water_temperature" in shadow
+        finally:
+            await broken.stop()
+            await healthy.stop()
+
+    asyncio.run(scenario())
+
+
+def test_deadline_timeouts_do_not_open_the_circuit():
+    async def scenario():
+        hanging, healthy = StandInServer(hang=True), StandInServer()
+        hanging_url, healthy_url = await start_standins(hanging, healthy)
+        device = hanging.devices[0]
+        try:
+            async with MSPAAPI(
+                hanging_url,
+                username="user",
+                password="secret",
+                endpoints=[{"base_url": hanging_url}, {"base_url": healthy_url}],
+            ) as api:
+                await api.login()
+                for _ in range(4):
+                    with pytest.raises(MSPAAPIConnectionError), api.deadline(0.1):
+                        await api.get_device_status(device["device_id"], device["product_id"])
+                assert api.base_url == hanging_url
+                assert api._endpoints.current.failures == 0
+        finally:
+            await hanging.stop()
+            await healthy.stop()
+
+    asyncio.run(scenario())
+
+
+def test_request_timeouts_open_the_circuit():
+    async def scenario():
+        hanging, healthy = StandInServer(hang=True), StandInServer()
+        hanging_url, healthy_url = await start_standins(hanging, healthy)
+        device = hanging.devices[0]
+        try:
+            async with MSPAAPI(
+                hanging_url,
+                username="user",
+                password="secret",
+                timeout=0.1,
+                endpoints=[{"base_url": hanging_url}, {"base_url": healthy_url}],
+            ) as api:
+                await api.login()
+                for _ in range(3):
+                    with pytest.raises(MSPAAPIConnectionError):
+                        await api.get_device_status(device["device_id"], device["product_id"])
+                assert api.base_url == healthy_url
+        finally:
+            await hanging.stop()
+            await healthy.stop()
+
+    asyncio.run(scenario())
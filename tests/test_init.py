@@ -0,0 +1,68 @@
+"""Tests for unloading a config entry while the cloud is stalled."""
+
+import asyncio
+import time
+from unittest.mock import patch
+
+import pytest
+
+pytest.importorskip("pytest_homeassistant_custom_component")
+
+from pytest_homeassistant_custom_component.common import MockConfigEntry  # noqa: E402
+
+from custom_components.mspa.const import COMMAND_QUEUED, DOMAIN, MODE_DEVICE  # noqa: E402
+from custom_components.mspa.standin import StandInServer  # noqa: E402
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture(autouse=True)
+def auto_enable_custom_integrations(enable_custom_integrations):
+    """Load the integration from custom_components."""
+    yield
+
+
+async def test_unload_during_stalled_refresh_is_bounded(hass, hass_storage):
+    server = StandInServer()
+    url = await server.start()
+    device = server.devices[0]
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={
+            "username": "user",
+            "password": "secret",
+            "device_id": device["device_id"],
+            "product_id": device["product_id"],
+            "device_name": device["name"],
+            "mode": MODE_DEVICE,
+        },
+    )
+    entry.add_to_hass(hass)
+    try:
+        with patch("custom_components.mspa.API_BASE_URL", url), patch(
+            "custom_components.mspa.API_ENDPOINTS", [{"base_url": url, "country": None}]
+        ):
+            assert await hass.config_entries.async_setup(entry.entry_id)
+            await hass.async_block_till_done()
+
+        coordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
+        server.hang = True
+        refresh = hass.async_create_task(coordinator.async_refresh())
+        command = hass.async_create_task(coordinator.async_send_command(device["device_id"], {"bubble_state": 1}))
+        while server.stalled < 2:
+            await asyncio.sleep(0.01)
+
+        started = time.monotonic()
+        assert await hass.config_entries.async_unload(entry.entry_id)
+        # Far below the refresh budget the stalled request would otherwise wait out
+        assert time.monotonic() - started < 2
+
+        # The refresh ends quietly with the data it had, without being cancelled
+        await asyncio.wait_for(refresh, timeout=1)
+        assert coordinator.data[device["device_id"]]
+        # A command cut off by the unload is kept for the next setup
+        assert (await asyncio.wait_for(command, timeout=1))["message"] == COMMAND_QUEUED
+        saved = hass_storage[f"{DOMAIN}.command_journal.{entry.entry_id}"]["data"]
+        assert saved["pending"] == {device["device_id"]: {"bubble_state": 1}}
+    finally:
+        await server.stop()
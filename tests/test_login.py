@@ -0,0 +1,41 @@
+"""Tests for logging in again once a stored token has expired."""
+
+import asyncio
+
+from custom_components.mspa.mspaapi import MSPAAPI
+from custom_components.mspa.standin import StandInServer
+
+
+def run_with_stale_token(scenario, **standin):
+    async def main():
+        server = StandInServer(**standin)
+        url = await server.start()
+        try:
+            async with MSPAAPI(url, username="user", password="secret", access_token="expired") as api:
+                return await scenario(api, server)
+        finally:
+            await server.stop()
+
+    return asyncio.run(main())
+
+
+def test_concurrent_polls_share_one_login():
+    async def scenario(api, server):
+        shadows = await asyncio.gather(
+            *(api.get_device_status(device["device_id"], device["product_id"]) for device in server.devices)
+        )
+        assert all(shadow["filter_state"] == 1 for shadow in shadows)
+        assert server.logins == 1
+        assert api.access_token in server.tokens
+
+    run_with_stale_token(scenario, devices=4, latency=0.02)
+
+
+def test_device_listing_logs_in_again_once():
+    async def scenario(api, server):
+        assert len(await api.get_user_devices()) == 2
+        assert server.logins == 1
+        await api.get_user_devices()
+        assert server.logins == 1
+
+    run_with_stale_token(scenario, devices=2)
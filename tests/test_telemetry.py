@@ -0,0 +1,177 @@
+"""Tests for the rolling telemetry models."""
+
+import pytest
+
+from custom_components.mspa.telemetry import HeatingRateEstimator, PublishGate, PublishPolicy, ShadowCadenceTracker
+
+HOUR = 3600.0
+
+
+def least_squares_slope(samples):
+    """Return the slope of a straight fit through (seconds, °C) samples, in °C/h."""
+    xs = [t / HOUR for t, _ in samples]
+    ys = [temp for _, temp in samples]
+    mean_x = sum(xs) / len(xs)
+    mean_y = sum(ys) / len(ys)
+    covariance = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys))
+    variance = sum((x - mean_x) ** 2 for x in xs)
+    return covariance / variance
+
+
+def test_rate_needs_two_samples():
+    estimator = HeatingRateEstimator()
+    assert estimator.rate is None
+    estimator.add(0, 30.0, 1)
+    assert estimator.rate is None
+    estimator.add(HOUR, 31.5, 1)
+    assert estimator.rate == pytest.approx(1.5)
+
+
+def test_rate_matches_brute_force_fit():
+    estimator = HeatingRateEstimator(capacity=16)
+    samples = [(i * 600.0, 25.0 + 0.2 * i + (0.3 if i % 3 else -0.1)) for i in range(40)]
+    for timestamp, temperature in samples:
+        estimator.add(timestamp, temperature, 1)
+    # Only the newest capacity samples are kept
+    assert len(estimator) == 16
+    assert estimator.rate == pytest.approx(least_squares_slope(samples[-16:]), abs=1e-9)
+
+
+def test_heater_change_starts_a_new_run():
+    estimator = HeatingRateEstimator()
+    for i in range(5):
+        estimator.add(i * 600.0, 35.0 - 0.1 * i, 0)
+    estimator.add(3000.0, 34.5, 1)
+    assert estimator.rate is None
+    estimator.add(3600.0, 34.8, 1)
+    estimator.add(4200.0, 35.2, 1)
+    run = [(3000.0, 34.5), (3600.0, 34.8), (4200.0, 35.2)]
+    assert estimator.heating
+    assert estimator.rate == pytest.approx(least_squares_slope(run), abs=1e-9)
+
+
+def test_eviction_shrinks_the_run():
+    estimator = HeatingRateEstimator(capacity=4)
+    samples = [(0.0, 20.0), (600.0, 21.0), (1200.0, 21.5), (1800.0, 23.0), (2400.0, 23.2), (3000.0, 24.4)]
+    for timestamp, temperature in samples:
+        estimator.add(timestamp, temperature, 1)
+    assert estimator.rate == pytest.approx(least_squares_slope(samples[-4:]), abs=1e-9)
+
+
+def test_out_of_order_and_duplicate_samples_are_ignored():
+    estimator = HeatingRateEstimator()
+    estimator.add(600.0, 30.0, 1)
+    estimator.add(600.0, 40.0, 1)
+    estimator.add(300.0, 40.0, 1)
+    assert len(estimator) == 1
+    assert estimator.latest == (600.0, 30.0, 1)
+
+
+def test_hours_to_target():
+    estimator = HeatingRateEstimator()
+    estimator.add(0.0, 30.0, 1)
+    estimator.add(HOUR, 31.0, 1)
+    assert estimator.hours_to(35.0) == pytest.approx(4.0)
+    # Already reached
+    assert estimator.hours_to(30.5) is None
+
+
+def test_hours_to_target_requires_heating_and_a_rising_trend():
+    cooling = HeatingRateEstimator()
+    cooling.add(0.0, 30.0, 1)
+    cooling.add(HOUR, 29.0, 1)
+    assert cooling.hours_to(35.0) is None
+
+    idle = HeatingRateEstimator()
+    idle.add(0.0, 30.0, 0)
+    idle.add(HOUR, 31.0, 0)
+    assert idle.hours_to(35.0) is None
+
+
+def test_capacity_must_hold_a_line():
+    with pytest.raises(ValueError):
+        HeatingRateEstimator(capacity=1)
+
+
+def test_cadence_is_not_guessed_without_report_times():
+    tracker = ShadowCadenceTracker()
+    for poll in range(20):
+        # Values change on every poll, but the shadow carries no report time
+        tracker.observe(1_700_000_000 + poll * 900.0, {"water_temperature": 60 + poll})
+    assert tracker.interval is None
+    assert tracker.freshness_lag is None
+    assert tracker.next_report(1_700_020_000) is None
+
+
+def test_cadence_learned_from_report_times():
+    tracker = ShadowCadenceTracker()
+    start = 1_700_000_000
+    for report in range(6):
+        reported_at = start + report * 300
+        tracker.observe(reported_at + 40, {"timestamp": reported_at * 1000, "water_temperature": 60})
+    assert tracker.interval == pytest.approx(300)
+    assert tracker.freshness_lag == pytest.approx(40)
+    assert tracker.next_report(start + 1550) == pytest.approx(start + 1800)
+
+
+def test_cadence_folds_missed_reports():
+    tracker = ShadowCadenceTracker()
+    start = 1_700_000_000
+    for reported_at in (start, start + 300, start + 600, start + 1800):
+        tracker.observe(reported_at + 5, {"ts": reported_at})
+    # The 1200 s gap spans four 300 s reports
+    assert tracker.interval == pytest.approx(300)
+
+
+def test_repeated_report_is_not_a_new_one():
+    tracker = ShadowCadenceTracker()
+    tracker.observe(1_700_000_010, {"ts": 1_700_000_000})
+    tracker.observe(1_700_000_900, {"ts": 1_700_000_000})
+    assert tracker.interval is None
+    assert tracker.freshness_lag == pytest.approx(10)
+
+
+def make_gate(**policy):
+    gate = PublishGate({"water_temperature": PublishPolicy(**policy)})
+    gate.published({"water_temperature": 30.0}, 0.0)
+    return gate
+
+
+def test_gate_publishes_first_values_and_new_keys():
+    gate = PublishGate({})
+    assert gate.evaluate({"water_temperature": 30.0}, 0.0) == 0
+    gate.published({"water_temperature": 30.0}, 0.0)
+    assert gate.evaluate({"water_temperature": 30.0, "heating_rate": 1.0}, 1.0) == 0
+
+
+def test_gate_without_policy_publishes_every_change():
+    gate = PublishGate({})
+    gate.published({"heater_state": 0}, 0.0)
+    assert gate.evaluate({"heater_state": 0}, 10.0) is None
+    assert gate.evaluate({"heater_state": 1}, 10.0) == 0
+
+
+def test_gate_ignores_changes_inside_the_deadband():
+    gate = make_gate(deadband=1.0)
+    assert gate.evaluate({"water_temperature": 30.5}, 100.0) is None
+    assert gate.evaluate({"water_temperature": 31.0}, 100.0) == 0
+    assert gate.evaluate({"water_temperature": 29.0}, 100.0) == 0
+
+
+def test_gate_holds_significant_changes_for_the_min_interval():
+    gate = make_gate(deadband=0.5, min_interval=60)
+    assert gate.evaluate({"water_temperature": 31.0}, 20.0) == pytest.approx(40.0)
+    assert gate.evaluate({"water_temperature": 31.0}, 60.0) == 0
+
+
+def test_gate_heartbeat_republishes_unchanged_values():
+    gate = make_gate(deadband=1.0, heartbeat=1800)
+    assert gate.evaluate({"water_temperature": 30.2}, 1799.0) is None
+    assert gate.evaluate({"water_temperature": 30.2}, 1800.0) == 0
+
+
+def test_gate_treats_unknown_values_as_changes():
+    gate = make_gate(deadband=1.0)
+    assert gate.evaluate({"water_temperature": None}, 5.0) == 0
+    gate.published({"water_temperature": None}, 5.0)
+    assert gate.evaluate({"water_temperature": None}, 10.0) is None